@@ -21,6 +21,7 @@ from .core.test.mock import Mock
 from .tools.login_required_dec import login_required
 from .tools.log import log
 from .core.db.model_not_found_error import ModelNotFoundError
+from .core.view.precondition_failed_error import PreconditionFailedError
 from .core.sock.socket import Socket
 from .core.sock.sock_ie import SockIe
 from .core.sock.sock import Sock
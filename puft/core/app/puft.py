@@ -19,6 +19,7 @@ from puft.tools.log import log
 from puft.core.sv.sv import Sv
 from puft.tools.hints import CLIModeEnumUnion
 from puft.core.view.view_ie import ViewIe
+from puft.core.view.etag import make_conditional
 from puft.core.cli.cli_run_enum import CLIRunEnum
 from .http_method_enum import HTTPMethodEnum
 from .turbo_action_enum import TurboActionEnum
@@ -194,7 +195,11 @@ class Puft(Sv):
         return self.native_app.test_request_context()
 
     def register_view(self, view_ie: ViewIe) -> None:
-        """Register given view cell for the app."""
+        """Register given view cell for the app.
+
+        View answers conditional requests by ETags of models given to
+        `View.set_etag()`.
+        """
         # Check if view has kwargs to avoid sending empty dict.
         # Use cell's name as view's endpoint.
         if view_ie.endpoint:
@@ -202,7 +207,8 @@ class Puft(Sv):
         else:
             endpoint = view_ie.get_transformed_route()
 
-        view = view_ie.view_class.as_view(endpoint)
+        view = make_conditional(
+            view_ie.view_class.as_view(endpoint), self.native_app)
         self.native_app.add_url_rule(
             view_ie.route, view_func=view,
             methods=get_enum_values(HTTPMethodEnum))
@@ -111,6 +111,7 @@ class Assembler(Singleton):
         self.each_request_func = self.build.each_request_func
         self.first_request_func = self.build.first_request_func
         self.sock_ies = self.build.sock_ies
+        self.backfills = self.build.backfills
         self.default_sock_error_handler = self.build.default_sock_error_handler
         self._assign_config_ies(self.build.config_dir)
         # Traverse given configs and assign enabled builtin cells
@@ -318,6 +319,14 @@ class Assembler(Singleton):
                     self.db.migrate_migration()
                 elif self.mode_enum is CLIDbEnum.UPGRADE:
                     self.db.upgrade_migration()
+                elif self.mode_enum is CLIDbEnum.BACKFILL:
+                    self._run_backfill()
+                elif self.mode_enum is CLIDbEnum.SEED:
+                    self._run_seed()
+                elif self.mode_enum is CLIDbEnum.ADVISE:
+                    self._run_advise()
+                elif self.mode_enum is CLIDbEnum.RECOUNT:
+                    self._run_recount()
                 else:
                     raise TypeError
         else:
@@ -330,6 +339,47 @@ class Assembler(Singleton):
     def _run_app(self):
         self.puft.run()
 
+    def _run_backfill(self):
+        """Run backfill by name given as mode arg, e.g.
+        `puft backfill fill_slugs`. Flag `--restart` discards stored
+        progress.
+        """
+        names: list[str] = [a for a in self.mode_args if a != '--restart']
+        if len(names) != 1:
+            raise CLIError(
+                'Mode `backfill` should be followed by one backfill name,'
+                f' available: {list(self.db.backfills)}')
+        self.db.run_backfill(
+            names[0], restart='--restart' in self.mode_args)
+
+    def _run_seed(self):
+        """Load fixtures from path given as mode arg or from db's default
+        fixtures path.
+        """
+        if len(self.mode_args) > 1:
+            raise CLIError(
+                'Mode `seed` accepts at most one path to fixtures')
+        path: str | None = None
+        if self.mode_args:
+            path = os.path.join(self.root_dir, self.mode_args[0])
+        self.db.load_fixtures(path)
+
+    def _run_advise(self):
+        """Generate migration with indexes advised for recorded query
+        shapes. Flag `--dry` only logs advised indexes.
+        """
+        unknown_args: list[str] = [a for a in self.mode_args if a != '--dry']
+        if unknown_args:
+            raise CLIError(
+                f'Mode `advise` accepts only `--dry` flag, got {unknown_args}')
+        self.db.advise_indexes(is_dry='--dry' in self.mode_args)
+
+    def _run_recount(self):
+        """Recount counter caches given by names as mode args, e.g.
+        `puft recount User.posts_count`, or all of them.
+        """
+        self.db.recount(self.mode_args or None)
+
     def _run_test(self):
         log.info('Run tests')
         pytest.main(self.mode_args)
@@ -433,6 +483,8 @@ class Assembler(Singleton):
                     first_request_func=self.first_request_func)
             elif type(cell) is DbSvIe:
                 self.db: Db = cell.sv_class(config=config)
+                for backfill in self.backfills:
+                    self.db.register_backfill(backfill)
                 # Perform Db postponed setup
                 self._perform_db_postponed_setup()
             elif type(cell) is SocketSvIe:
@@ -3,6 +3,7 @@ from typing import Callable
 from puft.tools.hints import CLIModeEnumUnion
 from puft.core.app.puft import Puft
 from puft.core.assembler.assembler import Assembler
+from puft.core.db.backfill import Backfill
 from puft.core.sock.default_sock_error_handler import default_sock_error_handler
 from puft.core.sock.sock_ie import SockIe
 
@@ -29,6 +30,7 @@ class Build:
         shell_processors: list[Callable] = [],
         cli_cmds: list[Callable] = [],
         sock_ies: list[SockIe] = [],
+        backfills: list[Backfill] = [],
         default_sock_error_handler: Callable = default_sock_error_handler,
         ctx_processor_func: Callable | None = None,
         each_request_func: Callable | None = None,
@@ -46,6 +48,7 @@ class Build:
         self.each_request_func = each_request_func
         self.first_request_func = first_request_func
         self.sock_ies = sock_ies
+        self.backfills = backfills
         self.default_sock_error_handler = default_sock_error_handler
 
     def build_app(
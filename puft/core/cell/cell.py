@@ -2,7 +2,8 @@ from dataclasses import dataclass, fields
 from typing import Any, ClassVar
 
 from schema import Schema
-from puft.core.db.db import orm
+from puft.core.db.db import Db, orm
+from puft.core.db.model_loader import Deferred
 from puft.tools.log import log
 from puft.core.cell.cell_error import CellError
 from warepy import snakefy
@@ -23,6 +24,30 @@ class Cell(Ie):
     def gen(cls, instance: orm.Model) -> 'Cell':
         return cls._gen_according(instance)
 
+    @classmethod
+    def load(cls, primary_key: Any, Model: Any = None) -> Deferred:
+        """Return deferred cell of model with given primary key or deferred
+        None if there is no such model.
+
+        Model is loaded within batch of all models of the same class
+        requested within current request, see `Db.load()`. Deferred cells
+        are resolved on serialization of cells containing them.
+
+        Args:
+            primary_key:
+                Primary key of model to generate cell from.
+            Model (optional):
+                ORM mapped model class to load. Defaults to cell's `Model`.
+        """
+        if Model is None:
+            Model = cls.Model
+        if Model is None:
+            raise CellError(
+                f'Cannot load model for cell {cls.__name__} without Model')
+
+        return Db.instance().load(Model, primary_key).then(
+            lambda model: None if model is None else cls.gen(model))
+
     @classmethod
     def _gen_according(cls, instance: orm.Model) -> Any:
         """Traverse all Models of all subclasses to find according to given
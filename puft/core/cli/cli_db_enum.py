@@ -4,4 +4,8 @@ from enum import Enum
 class CLIDbEnum(Enum):
     INIT = "init"
     MIGRATE = "migrate"
-    UPGRADE = "upgrade"
\ No newline at end of file
+    UPGRADE = "upgrade"
+    BACKFILL = "backfill"
+    SEED = "seed"
+    ADVISE = "advise"
+    RECOUNT = "recount"
\ No newline at end of file
@@ -0,0 +1,154 @@
+from __future__ import annotations
+import json
+import time
+from typing import Any, Callable
+
+import sqlalchemy as sa
+
+
+class Backfill:
+    """Data migration applied to existing rows of a model chunk by chunk.
+
+    Rows matched by `filters` are walked in ascending order of the primary
+    key and passed to `fn` by chunks of `chunk_size` models. Each chunk is
+    committed separately together with backfill's progress, so locks are
+    held only for one chunk and interrupted backfill resumes after the last
+    committed chunk.
+
+    Should be registered in Build to be run by `puft backfill <name>`:
+    ```python
+    def fill_slugs(posts: list[Post]) -> None:
+        for post in posts:
+            post.slug = slugify(post.title)
+
+    build = Build(
+        backfills=[Backfill('fill_slugs', Post, fill_slugs, rate=500)])
+    ```
+
+    Args:
+        name:
+            Unique name of the backfill to run and store progress by.
+        Model:
+            ORM mapped model to walk rows of. Its primary key should be
+            JSON-serializable, e.g. integer or string.
+        fn:
+            Function accepting list of models of a chunk. Changes made by it
+            are committed after it returns.
+        chunk_size (optional):
+            Count of models per chunk. Defaults to `backfill.chunk_size` from
+            db config or `Db.DEFAULT_BATCH_SIZE`.
+        rate (optional):
+            Max count of rows processed per second. Defaults to
+            `backfill.rate` from db config or no throttling.
+        filters (optional):
+            Kwargs to filter walked models by.
+    """
+    def __init__(
+            self,
+            name: str,
+            Model: Any,
+            fn: Callable[[list[Any]], None],
+            chunk_size: int | None = None,
+            rate: float | None = None,
+            filters: dict[str, Any] | None = None) -> None:
+        if chunk_size is not None and chunk_size < 1:
+            raise ValueError(f'Chunk size should be positive, got {chunk_size}')
+        if rate is not None and rate <= 0:
+            raise ValueError(f'Backfill rate should be positive, got {rate}')
+
+        self.name = name
+        self.Model = Model
+        self.fn = fn
+        self.chunk_size = chunk_size
+        self.rate = rate
+        self.filters = filters or {}
+
+
+class BackfillProgress:
+    """Progress of backfills stored in the db table, so it's committed in
+    the same transaction as processed chunk.
+
+    Table is held by its own metadata, so it's not a part of app's schema
+    and its migrations. It's created by `create()` when a backfill is run.
+
+    Progress of sharded models is stored per shard.
+    """
+    TABLE_NAME = 'puft_backfill'
+    # Shard of progress rows of not sharded models, since primary key
+    # columns can't be null
+    NO_SHARD = ''
+
+    def __init__(self) -> None:
+        self.table: sa.Table = sa.Table(
+            self.TABLE_NAME, sa.MetaData(),
+            sa.Column('name', sa.String(150), primary_key=True),
+            sa.Column('shard', sa.String(150), primary_key=True),
+            sa.Column('last_primary_key', sa.Text),
+            sa.Column('processed', sa.Integer, nullable=False),
+            sa.Column('is_finished', sa.Boolean, nullable=False),
+            sa.Column('updated_at', sa.Float, nullable=False))
+
+    def create(self, connection: Any) -> None:
+        """Create the table if it doesn't exist."""
+        self.table.create(bind=connection, checkfirst=True)
+
+    def drop(self, connection: Any) -> None:
+        """Drop the table if it exists."""
+        self.table.drop(bind=connection, checkfirst=True)
+
+    def get(
+            self,
+            session: Any,
+            name: str,
+            shard: str | None) -> tuple[Any, int, bool] | None:
+        """Return tuple (last primary key, processed count, is finished) of
+        given backfill or None if it has not been started.
+        """
+        row: Any = session.execute(
+            sa.select(
+                self.table.c.last_primary_key,
+                self.table.c.processed,
+                self.table.c.is_finished).where(
+                    self.table.c.name == name,
+                    self.table.c.shard == (shard or self.NO_SHARD))).first()
+        if row is None:
+            return None
+
+        last_primary_key: Any = None
+        if row[0] is not None:
+            last_primary_key = json.loads(row[0])
+        return last_primary_key, row[1], row[2]
+
+    def set(
+            self,
+            session: Any,
+            name: str,
+            shard: str | None,
+            last_primary_key: Any,
+            processed: int,
+            is_finished: bool = False) -> None:
+        """Write progress of given backfill within the session's current
+        transaction.
+        """
+        values: dict[str, Any] = {
+            'last_primary_key':
+                None if last_primary_key is None
+                else json.dumps(last_primary_key),
+            'processed': processed,
+            'is_finished': is_finished,
+            'updated_at': time.time()
+        }
+        criteria: list[Any] = [
+            self.table.c.name == name,
+            self.table.c.shard == (shard or self.NO_SHARD)]
+
+        result: Any = session.execute(
+            self.table.update().where(*criteria).values(**values))
+        if result.rowcount == 0:
+            session.execute(self.table.insert().values(
+                name=name, shard=shard or self.NO_SHARD, **values))
+
+    def reset(self, session: Any, name: str) -> None:
+        """Delete progress of given backfill on all shards."""
+        session.execute(
+            self.table.delete().where(self.table.c.name == name))
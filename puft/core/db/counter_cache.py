@@ -0,0 +1,142 @@
+from __future__ import annotations
+from typing import Any, Iterable
+
+import sqlalchemy as sa
+
+
+class CounterCache:
+    """Column of parent model holding count of its children of one-to-many
+    relationship.
+
+    Counter is incremented and decremented by statements executed within
+    the flush inserting, deleting or reassigning children, so it doesn't
+    load parents nor their collections. Counts of parents are recounted
+    from children tables by `recount()`, e.g. after bulk and set-based
+    writes, which don't emit mapper events.
+
+    Parents changed by the flush are remembered in session's info by
+    `TOUCHED_KEY` as tuples `(counter cache, parent primary key)`, so
+    their loaded counters can be expired after the flush.
+    """
+    TOUCHED_KEY = 'puft_counters_touched'
+
+    def __init__(self, Model: Any, name: str, relationship_name: str) -> None:
+        """
+        Raise:
+            AttributeError:
+                Relationship is not one-to-many relationship referencing
+                parent's primary key by one column.
+        """
+        self.Model = Model
+        self.name = name
+        self.relationship_name = relationship_name
+
+        mapper: Any = sa.inspect(Model)
+        relationship: Any = mapper.relationships.get(relationship_name, None)
+        if relationship is None \
+                or relationship.direction is not sa.orm.interfaces.ONETOMANY \
+                or relationship.secondary is not None \
+                or len(relationship.local_remote_pairs) != 1:
+            raise AttributeError(
+                f'Counter cache {self.full_name} should count one-to-many'
+                f' relationship {relationship_name} without secondary table'
+                ' and composite foreign key')
+        parent_column, child_column = relationship.local_remote_pairs[0]
+        if not parent_column.primary_key:
+            raise AttributeError(
+                f'Relationship {relationship_name} of counter cache'
+                f' {self.full_name} should reference primary key')
+
+        self.column: sa.Column = mapper.columns[name]
+        # Counter may be declared at joined subclass, which table shares
+        # primary keys with parent column's one
+        self.table: sa.Table = self.column.table
+        self.primary_key: sa.Column = list(self.table.primary_key)[0]
+        self.ChildModel: Any = relationship.mapper.class_
+        self.child_column: sa.Column = child_column
+        self.child_key: str = relationship.mapper.get_property_by_column(
+            child_column).key
+
+    @property
+    def full_name(self) -> str:
+        return f'{self.Model.__name__}.{self.name}'
+
+    def listen(self) -> None:
+        for event_name, fn in (
+                ('after_insert', self._count_inserted),
+                ('after_delete', self._count_deleted),
+                ('after_update', self._count_updated)):
+            sa.event.listen(self.ChildModel, event_name, fn, propagate=True)
+
+    def is_counting(self, Model: Any) -> bool:
+        """Return True if models of given class or of some of its subclasses
+        are counted.
+        """
+        mapper: Any = sa.inspect(Model)
+        child_mapper: Any = sa.inspect(self.ChildModel)
+        return mapper.isa(child_mapper) or child_mapper.isa(mapper)
+
+    def get_parent_keys(self, models: Iterable[Any]) -> set[Any]:
+        """Return primary keys of parents of given children."""
+        return {
+            getattr(model, self.child_key) for model in models
+            if isinstance(model, self.ChildModel)
+            and getattr(model, self.child_key) is not None}
+
+    def recount(
+            self,
+            connection: Any,
+            primary_keys: Iterable[Any] | None = None) -> int:
+        """Set counters of parents with given primary keys (or of all parents)
+        to actual counts of their children and return count of updated
+        parents.
+        """
+        child_primary_key: Any = getattr(
+            self.ChildModel, self.ChildModel._get_primary_key().key)
+        # Counted by ORM select to apply criteria of single table
+        # inheritance children
+        count: Any = sa.select(sa.func.count(child_primary_key)).where(
+            getattr(self.ChildModel, self.child_key) == self.primary_key
+        ).scalar_subquery()
+
+        statement: Any = self.table.update().values({self.column.name: count})
+        if primary_keys is not None:
+            primary_keys = list(primary_keys)
+            if not primary_keys:
+                return 0
+            statement = statement.where(self.primary_key.in_(primary_keys))
+        return connection.execute(statement).rowcount
+
+    def _count_inserted(self, mapper: Any, connection: Any, target: Any) -> None:
+        self._increment(connection, target, getattr(target, self.child_key), 1)
+
+    def _count_deleted(self, mapper: Any, connection: Any, target: Any) -> None:
+        self._increment(
+            connection, target, getattr(target, self.child_key), -1)
+
+    def _count_updated(self, mapper: Any, connection: Any, target: Any) -> None:
+        history: Any = sa.inspect(target).attrs[self.child_key].history
+        if not history.has_changes():
+            return
+        for primary_key in history.deleted:
+            self._increment(connection, target, primary_key, -1)
+        for primary_key in history.added:
+            self._increment(connection, target, primary_key, 1)
+
+    def _increment(
+            self,
+            connection: Any,
+            target: Any,
+            primary_key: Any,
+            delta: int) -> None:
+        if primary_key is None:
+            return
+        connection.execute(
+            self.table.update()
+            .where(self.primary_key == primary_key)
+            .values({self.column.name: self.column + delta}))
+
+        session: Any = sa.orm.object_session(target)
+        if session is not None:
+            session.info.setdefault(self.TOUCHED_KEY, set()).add(
+                (self, primary_key))
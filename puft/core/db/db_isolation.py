@@ -0,0 +1,194 @@
+from __future__ import annotations
+import sqlite3
+from contextlib import contextmanager
+from typing import Any, Iterator, TYPE_CHECKING
+
+import sqlalchemy as sa
+from flask import Flask
+
+from .db_isolation_enum import DbIsolationEnum
+
+if TYPE_CHECKING:
+    from .db import Db
+
+
+class DbIsolation:
+    """Isolates changes made by tests from each other.
+
+    `RECREATE` mode drops and creates all tables around each test. Other
+    modes create tables once and undo changes of each test instead:
+
+    - `TRANSACTION` mode binds sessions to connections in outer transactions
+    rolled back after the test. Sessions work within savepoints restarted on
+    each commit or rollback, so tests can commit and roll back as usual.
+    Statements executed by engines directly are not isolated. Moreover
+    connections of in-memory SQLite are shared, so returning of such
+    connection to the pool rolls back the test's transaction.
+    - `SNAPSHOT` mode copies SQLite databases to in-memory templates right
+    after tables creation and restores them after each test by SQLite's
+    backup API. Unlike `TRANSACTION`, it also undoes changes committed by
+    connections not bound to the session.
+
+    Both modes apply to the primary db and shards. In-memory SQLite
+    databases are held by a single connection shared between threads
+    (`StaticPool`), so all of them see the same data.
+    """
+    def __init__(self, db: Db) -> None:
+        self.db = db
+        self.is_schema_created: bool = False
+
+        # Tuples (engine, in-memory copy of engine's database)
+        self._templates: list[tuple[sa.engine.Engine, sqlite3.Connection]] = []
+        # Tuples (connection, outer transaction, nested transaction,
+        # original isolation level of SQLite connection)
+        self._transactions: list[tuple[Any, Any, Any, Any]] = []
+
+    @contextmanager
+    def isolate(
+            self,
+            flask_app: Flask,
+            isolation_enum: DbIsolationEnum) -> Iterator[None]:
+        """Isolate changes made by a test within the scope."""
+        if isolation_enum is DbIsolationEnum.RECREATE:
+            with flask_app.app_context():
+                self._reset_schema()
+                self.db.create_all()
+            try:
+                yield
+            finally:
+                with flask_app.app_context():
+                    self.db.drop_all()
+            return
+
+        with flask_app.app_context():
+            if not self.is_schema_created:
+                self._reset_schema()
+                self.db.create_all()
+                self.is_schema_created = True
+            if isolation_enum is DbIsolationEnum.SNAPSHOT \
+                    and not self._templates:
+                self._create_templates()
+
+        try:
+            if isolation_enum is DbIsolationEnum.TRANSACTION:
+                with flask_app.app_context():
+                    self._begin_transactions()
+                try:
+                    yield
+                finally:
+                    with flask_app.app_context():
+                        self._rollback_transactions()
+            else:
+                try:
+                    yield
+                finally:
+                    with flask_app.app_context():
+                        self._restore_templates()
+        finally:
+            self.db._clear_caches()
+
+    def _reset_schema(self) -> None:
+        """Drop all tables and forget templates of dropped schema."""
+        self.db.drop_all()
+        self.is_schema_created = False
+        for _, template in self._templates:
+            template.close()
+        self._templates = []
+
+    def _get_engines(self) -> list[tuple[str | None, sa.engine.Engine]]:
+        """Return tuples (shard name or None for the primary, engine)."""
+        native_db: Any = self.db.native_db
+        return [
+            (None, native_db.engine),
+            *[
+                (shard, native_db.get_engine(bind=shard))
+                for shard in native_db.shard_names]]
+
+    def _create_templates(self) -> None:
+        for _, engine in self._get_engines():
+            if engine.dialect.name != 'sqlite':
+                raise ValueError(
+                    'Snapshot db isolation is supported only by SQLite, got'
+                    f' {engine.dialect.name}')
+
+            template: sqlite3.Connection = sqlite3.connect(
+                ':memory:', check_same_thread=False)
+            raw_connection: Any = engine.raw_connection()
+            try:
+                raw_connection.connection.backup(template)
+            finally:
+                raw_connection.close()
+            self._templates.append((engine, template))
+
+    def _restore_templates(self) -> None:
+        # Session's connections should be returned to the pool to not hold
+        # transactions during restoring
+        self.db.native_db.session.remove()
+        for engine, template in self._templates:
+            raw_connection: Any = engine.raw_connection()
+            try:
+                template.backup(raw_connection.connection)
+            finally:
+                raw_connection.close()
+
+    def _begin_transactions(self) -> None:
+        session: Any = self.db.native_db.session
+        session.remove()
+
+        binds: dict[str | None, Any] = {}
+        for shard, engine in self._get_engines():
+            binds[shard] = self._begin_transaction(engine)
+
+        session.session_factory.configure(
+            bind=binds.pop(None), binds={}, shard_binds=binds)
+        sa.event.listen(
+            session, 'after_transaction_end', self._restart_savepoints)
+
+    def _begin_transaction(self, engine: sa.engine.Engine) -> Any:
+        connection: Any = engine.connect()
+        isolation_level: Any = None
+        if engine.dialect.name == 'sqlite':
+            # Pysqlite doesn't emit BEGIN by itself before SAVEPOINT, so
+            # transactions are controlled explicitly
+            dbapi_connection: Any = connection.connection.connection
+            isolation_level = dbapi_connection.isolation_level
+            dbapi_connection.isolation_level = None
+            transaction: Any = connection.begin()
+            connection.exec_driver_sql('BEGIN')
+        else:
+            transaction = connection.begin()
+
+        self._transactions.append((
+            connection, transaction, connection.begin_nested(),
+            isolation_level))
+        return connection
+
+    def _restart_savepoints(self, session: Any, transaction: Any) -> None:
+        """Begin new savepoints instead of ended ones, so the next session's
+        transaction still works inside the outer one.
+        """
+        for ix, (connection, outer_transaction, nested_transaction,
+                isolation_level) in enumerate(self._transactions):
+            if not nested_transaction.is_active \
+                    and outer_transaction.is_active:
+                self._transactions[ix] = (
+                    connection, outer_transaction,
+                    connection.begin_nested(), isolation_level)
+
+    def _rollback_transactions(self) -> None:
+        session: Any = self.db.native_db.session
+        session.remove()
+        sa.event.remove(
+            session, 'after_transaction_end', self._restart_savepoints)
+        for key in ('bind', 'binds', 'shard_binds'):
+            session.session_factory.kw.pop(key, None)
+
+        transactions: list[tuple[Any, Any, Any, Any]] = self._transactions
+        self._transactions = []
+        for connection, transaction, _, isolation_level in transactions:
+            if transaction.is_active:
+                transaction.rollback()
+            if connection.dialect.name == 'sqlite':
+                connection.connection.connection.isolation_level = \
+                    isolation_level
+            connection.close()
@@ -0,0 +1,10 @@
+from enum import Enum
+
+
+class DbIsolationEnum(Enum):
+    # Drop and create all tables around each test
+    RECREATE = "recreate"
+    # Roll back outer transaction of each test
+    TRANSACTION = "transaction"
+    # Restore SQLite databases from in-memory templates after each test
+    SNAPSHOT = "snapshot"
@@ -0,0 +1,951 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from alembic.autogenerate import produce_migrations, render_python_code
+from alembic.migration import MigrationContext
+from pytest import fixture
+from puft.core.app.puft import Puft
+from puft.core.assembler.assembler import Assembler
+from puft.core.assembler.build import Build
+from puft.core.cell.cell import Cell
+from puft.core.cli.cli_run_enum import CLIRunEnum
+from puft.core.db.backfill import Backfill, BackfillProgress
+from puft.core.db.db import Db, orm
+from puft.core.db.db_isolation_enum import DbIsolationEnum
+from puft.core.db.identity_cache import IdentityCache
+from puft.core.db.index_advisor import IndexAdvisor
+from puft.core.db.model_not_found_error import ModelNotFoundError
+from puft.core.db.query_cache import QueryCache
+from puft.core.db.search_index import (
+    CreateSearchIndexOp, DropSearchIndexOp, SearchIndex, include_search_object)
+from puft.core.parsing import parse_models
+from puft.core.test.test import Test
+
+from blog.app.article.article import Article
+from blog.app.comment.comment import Comment, PinnedComment
+from blog.app.document.document import Document
+from blog.app.event.event import Event
+from blog.app.library.author import Author
+from blog.app.library.book import Book
+from blog.app.note.note import Note
+from blog.app.user.moderator import Moderator
+from blog.app.user.user import User, AdvancedUser
+from blog.app.post.post import Post
+from blog.app.post.tag.tag import Tag
+
+
+@dataclass
+class UserCell(Cell):
+    Model = User
+    username: str
+
+    @classmethod
+    def gen_instance(cls, user: User) -> 'UserCell':
+        return cls(id=user.id, type=user.type, username=user.username)
+
+
+@dataclass
+class PostCell(Cell):
+    Model = Post
+    title: str
+    user: Any
+
+    @classmethod
+    def gen_instance(cls, post: Post) -> 'PostCell':
+        return cls(
+            id=post.id, type='post', title=post.title,
+            user=UserCell.load(post.user_id))
+
+
+@fixture
+def assembler_test(blog_build: Build, default_host: str, default_port: int):
+    return Assembler(
+        build=blog_build,
+        mode_enum=CLIRunEnum.TEST,
+        host=default_host,
+        port=default_port)
+
+
+class TestDb(Test):
+    @fixture
+    def app(self, assembler_test: Assembler):
+        app: Puft = assembler_test.get_puft()
+        yield app
+
+    def test_create_many(self, app: Puft, db: Db):
+        with app.app_context():
+            AdvancedUser.create_many(
+                [{'username': f'user{i}'} for i in range(5)], batch_size=2)
+
+            users: list[User] = User.get_all(order_by=User.id)
+
+            assert [u.username for u in users] == [
+                f'user{i}' for i in range(5)]
+            assert {u.type for u in users} == {'advanced_user'}
+            assert all(type(u) is AdvancedUser for u in users)
+
+    def test_create_many_return_defaults(self, app: Puft, db: Db):
+        with app.app_context():
+            users: list[User] = User.create_many(
+                [{'username': 'first'}, {'username': 'second'}],
+                return_defaults=True)
+
+            assert [u.id for u in users] == [1, 2]
+            assert User.get_first(id=2).username == 'second'
+
+    def test_transaction(self, app: Puft, db: Db):
+        with app.app_context():
+            with db.transaction():
+                db.push(User(username='first'))
+                db.push(User(username='second'))
+                assert db.is_in_transaction()
+
+            assert not db.is_in_transaction()
+            assert User.get_all(order_by=User.id)[1].username == 'second'
+
+    def test_transaction_rollback(self, app: Puft, db: Db):
+        with app.app_context():
+            with pytest.raises(ValueError):
+                with db.transaction():
+                    db.push(User(username='first'))
+                    raise ValueError
+
+            assert User.get_all() == []
+
+    def test_transaction_savepoint(self, app: Puft, db: Db):
+        @Db.transaction()
+        def create_second() -> None:
+            db.push(User(username='second'))
+            raise ValueError
+
+        with app.app_context():
+            with db.transaction():
+                db.push(User(username='first'))
+                with pytest.raises(ValueError):
+                    create_second()
+
+            assert [u.username for u in User.get_all()] == ['first']
+
+    def test_iter_all(self, app: Puft, db: Db):
+        with app.app_context():
+            User.create_many(
+                {'username': name} for name in ['c', 'a', 'b', 'a', 'd'])
+
+            assert [u.id for u in User.iter_all(chunk_size=2)] == \
+                [1, 2, 3, 4, 5]
+            assert [
+                u.id for u in User.iter_all(
+                    order_by=User.username, chunk_size=2)] == [2, 4, 3, 1, 5]
+            assert [
+                u.id for u in User.iter_all(chunk_size=1, username='a')] == \
+                [2, 4]
+            assert [
+                u.id for u in User.iter_all(
+                    order_by=User.username.desc(), chunk_size=2)] == \
+                [5, 1, 3, 4, 2]
+            assert [
+                u.id for u in User.iter_all(
+                    order_by=User.id.desc(), chunk_size=2)] == [5, 4, 3, 2, 1]
+            with pytest.raises(ValueError):
+                list(User.iter_all(order_by=sa.func.lower(User.username)))
+
+    def test_identity_cache(self, app: Puft, db: Db):
+        with app.app_context():
+            db.push(User(username='first'))
+            db.push(AdvancedUser(username='second'))
+
+        cache: IdentityCache | None = db.get_identity_cache(User)
+        assert cache is not None
+        hits: int = cache.hits
+
+        with app.app_context():
+            assert User.get_first(id=1).username == 'first'
+        with app.app_context():
+            user: User = User.get_first(id='1')
+            assert user.username == 'first'
+            assert cache.hits == hits + 1
+
+            # Lazy loading works for models restored from cache
+            assert user.posts == []
+
+            user.username = 'changed'
+            db.commit()
+            assert len(cache) == 0
+
+        with app.app_context():
+            assert User.get_first(id=1).username == 'changed'
+            assert type(User.get_first(id=2)) is AdvancedUser
+            with pytest.raises(ModelNotFoundError):
+                AdvancedUser.get_first(id=1)
+
+    def test_identity_cache_rollback(self, app: Puft, db: Db):
+        with app.app_context():
+            db.push(User(username='first'))
+
+        with app.app_context():
+            with pytest.raises(ValueError):
+                with db.transaction():
+                    User.get_first(id=1).username = 'changed'
+                    db.commit()
+                    assert User.get_first(id=1).username == 'changed'
+                    raise ValueError
+
+        with app.app_context():
+            assert User.get_first(id=1).username == 'first'
+
+    def test_query_cache(self, app: Puft, db: Db):
+        with app.app_context():
+            User.create_many(
+                {'username': name} for name in ['b', 'a', 'c'])
+
+        query_cache: QueryCache | None = db.query_cache
+        assert query_cache is not None
+        hits: int = query_cache.hits
+
+        with app.app_context():
+            assert [
+                u.username for u in User.get_all(
+                    order_by=User.username, limit=2, cache=True)] == ['a', 'b']
+        with app.app_context():
+            assert [
+                u.username for u in User.get_all(
+                    order_by=User.username, limit=2, cache=True)] == ['a', 'b']
+            assert query_cache.hits == hits + 1
+
+            db.push(AdvancedUser(username='0'))
+
+        with app.app_context():
+            assert [
+                u.username for u in User.get_all(
+                    order_by=User.username, limit=2, cache=True)] == ['0', 'a']
+            assert query_cache.hits == hits + 1
+
+    def test_async(self, app: Puft, db: Db):
+        pytest.importorskip('aiosqlite')
+
+        async def run_crud() -> None:
+            # In-memory async engine holds own database
+            async with db.get_async_engine().begin() as connection:
+                await connection.run_sync(db.native_db.metadata.drop_all)
+                await connection.run_sync(db.native_db.metadata.create_all)
+
+            await User.acreate(username='first')
+            created: User = await AdvancedUser.acreate(username='second')
+            assert created.id == 2
+
+            assert type(await User.aget_first(id=2)) is AdvancedUser
+            assert [
+                u.username for u in await User.aget_all(
+                    order_by=User.id.desc(), limit=1)] == ['second']
+
+            await User.adel_first(username='first')
+            with pytest.raises(ModelNotFoundError):
+                await User.aget_first(username='first')
+
+        # Cache listeners are added once to class of underlying sessions
+        session_class: type = type(db.async_session().sync_session)
+        assert type(db.async_session().sync_session) is session_class
+        assert sa.event.contains(
+            session_class, 'after_flush', db._invalidate_caches_on_flush)
+
+        async def run() -> None:
+            try:
+                await run_crud()
+            finally:
+                await db.dispose_async_engine()
+
+        asyncio.run(run())
+
+    def test_sqlite_pragmas(self, app: Puft, db: Db):
+        with app.app_context():
+            connection: Any = db.native_db.engine.raw_connection()
+            try:
+                cursor: Any = connection.cursor()
+                cursor.execute('PRAGMA temp_store')
+                # 2 stands for MEMORY
+                assert cursor.fetchone()[0] == 2
+                cursor.execute('PRAGMA busy_timeout')
+                assert cursor.fetchone()[0] == 5000
+            finally:
+                connection.close()
+
+    def test_polymorphic_loading(self, app: Puft, db: Db):
+        assert [i.name for i in User.__table__.indexes] == ['ix_user_type']
+
+        with app.app_context():
+            db.push(User(username='first'))
+            db.push(Moderator(username='second', level=2))
+            db.push(AdvancedUser(username='third'))
+
+        with app.app_context():
+            users: list[User] = User.get_all(order_by=User.id)
+            assert [type(u) for u in users] == [User, Moderator, AdvancedUser]
+            # Loaded by selectin polymorphic loading, i.e. without lazy
+            # loading afterwards
+            assert 'level' in sa.inspect(users[1]).dict
+            assert users[1].level == 2
+
+    def test_polymorphic_identity(self, app: Puft, db: Db):
+        with app.app_context():
+            db.push(Comment(text='first'))
+            db.push(PinnedComment(text='second', position=1))
+
+            # Model with own table is identified by the table name, single
+            # table subclass by its class name
+            assert db.native_db.session.execute(sa.text(
+                'SELECT type FROM post_comment ORDER BY id')).scalars().all() \
+                == ['post_comment', 'pinned_comment']
+
+        with app.app_context():
+            assert [type(c) for c in Comment.get_all(order_by=Comment.id)] \
+                == [Comment, PinnedComment]
+
+    def test_eager_loading(self, app: Puft, db: Db):
+        with app.app_context():
+            tags: list[Tag] = [Tag(name=f'tag{j}') for j in range(2)]
+            for i in range(3):
+                db.push(User(
+                    username=f'user{i}',
+                    posts=[
+                        Post(title=f'post{i}{j}', tags=[tags[j]])
+                        for j in range(2)]))
+
+        with app.app_context():
+            users: list[User] = User.get_all(order_by=User.id)
+            assert [len(u.posts) for u in users] == [2, 2, 2]
+            assert db.get_lazy_load_counts() == {'User.posts': 3}
+
+        with app.app_context():
+            for load_strategy in ['selectin', 'joined', 'subquery']:
+                users = User.get_all(
+                    order_by=User.id,
+                    load=['posts', 'posts.tags'],
+                    load_strategy=load_strategy)
+                assert [[t.name for p in u.posts for t in p.tags]
+                    for u in users] == [['tag0', 'tag1']] * 3
+
+            user: User = User.get_first(id=2, load=['posts'])
+            assert [p.title for p in user.posts] == ['post10', 'post11']
+            assert db.get_lazy_load_counts() == {}
+
+            with pytest.raises(AttributeError):
+                User.get_all(load=['posts.author'])
+
+    def test_columns(self, app: Puft, db: Db):
+        with app.app_context():
+            db.push(User(username='first'))
+            db.push(AdvancedUser(username='second'))
+            db.push(AdvancedUser(username='third'))
+
+        with app.app_context():
+            rows: list[Any] = AdvancedUser.get_all(
+                columns=[AdvancedUser.id, AdvancedUser.username],
+                order_by=AdvancedUser.id.desc(), limit=5)
+
+            assert [tuple(r) for r in rows] == [(3, 'third'), (2, 'second')]
+            assert rows[0].username == 'third'
+            assert len(db.native_db.session.identity_map) == 0
+
+            assert [r.id for r in User.get_all(
+                columns=[User.id], username='first')] == [1]
+
+            with pytest.raises(ValueError):
+                User.get_all(columns=[User.id], load=['posts'])
+
+    def test_deferred_columns(self, app: Puft, db: Db):
+        with app.app_context():
+            db.push(Note(title='first', content='long text'))
+
+        with app.app_context():
+            note: Note = Note.get_first(title='first')
+            assert 'content' not in sa.inspect(note).dict
+            assert note.content == 'long text'
+
+        with pytest.raises(AttributeError):
+            class BrokenNote(orm.Model):
+                __deferred__ = ['content']
+
+    def test_aggregates(self, app: Puft, db: Db):
+        with app.app_context():
+            db.push(User(username='first'))
+            db.push(AdvancedUser(
+                username='second',
+                posts=[Post(title='a'), Post(title='b')]))
+            db.push(AdvancedUser(username='third', posts=[Post(title='c')]))
+
+        with app.app_context():
+            assert User.count() == 3
+            assert AdvancedUser.count() == 2
+            assert User.count(username='first') == 1
+            assert Post.count(title='d') == 0
+
+            assert User.exists(username='first')
+            assert not AdvancedUser.exists(username='first')
+
+            assert Post.aggregate('max', Post.title) == 'c'
+            assert Post.aggregate(
+                sa.func.count, Post.id, group_by=Post.user_id) == {2: 2, 3: 1}
+            assert Post.aggregate(
+                'count', Post.id, group_by=[Post.user_id, Post.title],
+                title='a') == {(2, 'a'): 1}
+
+            assert parse_models(User, 'count', username='second') == 1
+            # Nothing is loaded to the session
+            assert len(db.native_db.session.identity_map) == 0
+
+    def test_del_all(self, app: Puft, db: Db):
+        with app.app_context():
+            db.push(User(username='first'))
+            db.push(AdvancedUser(username='second'))
+            db.push(AdvancedUser(username='third'))
+            db.push(Moderator(username='fourth', level=1))
+            db.push(Moderator(username='fifth', level=2))
+
+        with app.app_context():
+            loaded: User = User.get_first(username='third')
+
+            assert AdvancedUser.del_all() == 2
+            assert loaded not in db.native_db.session
+            assert [u.username for u in User.get_all(order_by=User.id)] == [
+                'first', 'fourth', 'fifth']
+
+            # Joined subclass rows are deleted from both tables
+            assert Moderator.del_all(level=2) == 1
+            assert User.del_all(username='fourth') == 1
+            assert db.native_db.session.execute(
+                sa.text('SELECT COUNT(*) FROM moderator')).scalar() == 0
+            assert [u.username for u in User.get_all()] == ['first']
+
+    def test_update_all(self, app: Puft, db: Db):
+        with app.app_context():
+            db.push(User(username='first'))
+            db.push(AdvancedUser(username='second'))
+            db.push(Moderator(username='third', level=1))
+
+        with app.app_context():
+            loaded: User = User.get_first(id=2)
+            assert loaded.username == 'second'
+
+            assert AdvancedUser.update_all({'username': 'renamed'}) == 1
+            assert loaded.username == 'renamed'
+            assert User.get_first(id=1).username == 'first'
+
+            moderator: Moderator = Moderator.get_first(id=3)
+            assert Moderator.update_all(
+                {'username': 'boss', 'level': 5}, level=1) == 1
+            assert (moderator.username, moderator.level) == ('boss', 5)
+
+        with app.app_context():
+            assert User.get_first(id=2).username == 'renamed'
+            assert Moderator.get_first(username='boss').level == 5
+
+    def test_query_profiler(self, app: Puft, db: Db):
+        with app.app_context():
+            db.push(User(username='first'))
+
+        with app.app_context():
+            with db.assert_max_queries(1) as profile:
+                User.get_all()
+            assert profile.query_count == 1
+
+            with pytest.raises(AssertionError):
+                with db.assert_max_queries(1):
+                    User.get_all()
+                    Post.get_all()
+
+            assert db.get_query_profile().query_count == 3
+
+    def test_statement_cache(self, app: Puft, db: Db):
+        with app.app_context():
+            db.push(User(username='first'))
+            db.push(AdvancedUser(username='second'))
+
+        with app.app_context():
+            db.statement_cache.clear()
+            stats: dict[str, Any] = db.get_statement_cache_stats()
+
+            for username in ['first', 'second']:
+                assert User.get_first(username=username).username == username
+            assert User.get_all(username=None) == []
+            assert [u.username for u in AdvancedUser.get_all(
+                order_by=AdvancedUser.id.desc())] == ['second']
+            assert [u.username for u in User.get_all(
+                order_by=User.id.desc())] == ['second', 'first']
+            # Not cacheable since ordered by expression with literal
+            User.get_all(order_by=sa.case((User.id == 1, 0), else_=1))
+            # Not cacheable since filtered by expressions
+            assert [u.username for u in User.get_all(
+                username=sa.func.lower('FIRST'))] == ['first']
+            assert User.get_first(id=sa.literal(2)).username == 'second'
+
+            new_stats: dict[str, Any] = db.get_statement_cache_stats()
+            assert new_stats['size'] == 4
+            assert new_stats['hits'] - stats['hits'] == 1
+            assert new_stats['misses'] - stats['misses'] == 4
+
+    def test_sharding(self, app: Puft, db: Db):
+        tenants: list[str] = ['a', 'b', 'c', 'd']
+        shards: list[str] = [Event.choose_shard(t) for t in tenants]
+        assert set(shards) == {'first', 'second'}
+
+        with app.app_context():
+            for ix, tenant in enumerate(tenants):
+                Event.create(tenant=tenant, name=f'event{ix}')
+            Event.create_many([{'tenant': 'a', 'name': 'event4'}])
+
+            for shard in ['first', 'second']:
+                names: list[str] = [
+                    row[0] for row in db.native_db.get_engine(bind=shard)
+                    .execute(sa.text('SELECT name FROM event'))]
+                assert sorted(names) == sorted(
+                    f'event{ix}' for ix, s in enumerate(shards + [shards[0]])
+                    if s == shard)
+
+        with app.app_context():
+            events: list[Event] = Event.get_all(order_by=Event.name.desc())
+            assert [e.name for e in events] == [
+                f'event{ix}' for ix in reversed(range(5))]
+            # Same ids of different shards are not mixed
+            assert len({sa.inspect(e).identity_key for e in events}) == 5
+            assert [e.name for e in Event.get_all(
+                order_by=Event.name, limit=2)] == ['event0', 'event1']
+
+            event: Event = Event.get_first(tenant='b')
+            event.name = 'renamed'
+            db.commit()
+
+            assert Event.count() == 5
+            assert Event.count(tenant='a') == 2
+            assert Event.exists(name='renamed')
+            assert Event.exists(tenant='b', name='renamed')
+            assert not Event.exists(tenant='a', name='renamed')
+            with pytest.raises(NotImplementedError):
+                Event.aggregate('max', Event.name)
+            assert Event.aggregate('max', Event.name, tenant='a') == 'event4'
+
+            assert Event.update_all({'name': 'updated'}, tenant='c') == 1
+            assert Event.del_all(tenant='a') == 2
+            assert sorted(r.name for r in Event.get_all(
+                columns=[Event.name])) == ['event3', 'renamed', 'updated']
+
+            # NULLs are merged as SQLite orders them: smaller than any value
+            Event.create(tenant='a', name=None)
+            assert [e.name for e in Event.get_all(order_by=Event.name)] == \
+                [None, 'event3', 'renamed', 'updated']
+            assert [e.name for e in Event.get_all(
+                order_by=Event.name.desc())] == \
+                ['updated', 'renamed', 'event3', None]
+            assert [e.name for e in Event.get_all(
+                order_by=Event.name.desc().nullsfirst())] == \
+                [None, 'updated', 'renamed', 'event3']
+            # PostgreSQL considers NULLs larger than any value
+            assert [e.name for e in Event._sort_models(
+                Event.get_all(), Event.name, 'postgresql')] == \
+                ['event3', 'renamed', 'updated', None]
+
+    def test_backfill(self, app: Puft, db: Db):
+        calls: list[list[int]] = []
+
+        def upper_usernames(users: list[User]) -> None:
+            calls.append([u.id for u in users])
+            if len(calls) == 2 and fail:
+                raise RuntimeError('interrupted')
+            for user in users:
+                user.username = user.username.upper()
+
+        db.register_backfill(Backfill(
+            'upper_usernames', User, upper_usernames, chunk_size=2))
+
+        # Progress table is not a part of app's schema and its migrations
+        assert BackfillProgress.TABLE_NAME not in db.native_db.metadata.tables
+
+        with app.app_context():
+            User.create_many([{'username': f'user{i}'} for i in range(5)])
+
+            fail: bool = True
+            with pytest.raises(RuntimeError):
+                db.run_backfill('upper_usernames')
+            # Only the first chunk is committed
+            assert [u.username for u in User.get_all(order_by=User.id)] == \
+                ['USER0', 'USER1', 'user2', 'user3', 'user4']
+
+            fail = False
+            calls.clear()
+            stats: dict[str, Any] = db.run_backfill('upper_usernames')
+            assert calls == [[3, 4], [5]]
+            assert stats['processed'] == 5
+            assert [u.username for u in User.get_all(order_by=User.id)] == \
+                [f'USER{i}' for i in range(5)]
+
+            # Finished backfill is not run again unless restarted
+            calls.clear()
+            assert db.run_backfill('upper_usernames')['processed'] == 5
+            assert calls == []
+            db.run_backfill('upper_usernames', restart=True)
+            assert calls == [[1, 2], [3, 4], [5]]
+
+            with pytest.raises(ValueError):
+                db.run_backfill('unknown')
+
+    def test_load_fixtures(self, app: Puft, db: Db, tmp_path: Any):
+        (tmp_path / 'user.yaml').write_text(
+            '- _ref: alice\n'
+            '  username: alice\n'
+            '- _ref: bob\n'
+            '  username: bob\n')
+        (tmp_path / 'post.csv').write_text(
+            '_ref,title,content,user_id\n'
+            'hello,Hello,,@bob\n'
+            'bye,Bye,See you,@alice\n')
+        (tmp_path / 'tag.ndjson').write_text(
+            '{"_ref": "news", "name": "news"}\n')
+        (tmp_path / 'links.json').write_text(
+            '{"post_tag": [{"post_id": "@hello", "tag_id": "@news"}]}')
+
+        with app.app_context():
+            User.create_many([{'username': 'existing'}])
+
+            assert db.load_fixtures(str(tmp_path)) == {
+                'user': 2, 'post': 2, 'tag': 1, 'post_tag': 1}
+
+            bob: User = User.get_first(username='bob')
+            assert bob.id == 3
+            posts: list[Post] = Post.get_all(order_by=Post.id)
+            assert [(p.title, p.content, p.user.username) for p in posts] \
+                == [('Hello', None, 'bob'), ('Bye', 'See you', 'alice')]
+            assert [t.name for t in posts[0].tags] == ['news']
+
+            # Rows of earlier tables are rolled back on failure
+            (tmp_path / 'tag.ndjson').unlink()
+            (tmp_path / 'links.json').unlink()
+            (tmp_path / 'user.yaml').write_text('- username: carol\n')
+            (tmp_path / 'post.csv').write_text('title,user_id\nOrphan,@eve\n')
+            with pytest.raises(ValueError):
+                db.load_fixtures(str(tmp_path))
+            assert User.count(username='carol') == 0
+            assert User.count() == 3
+
+    def test_model_loader(self, app: Puft, db: Db):
+        with app.app_context():
+            User.create_many([{'username': f'user{i}'} for i in range(3)])
+            Post.create_many(
+                [{'title': f'post{i}', 'user_id': i % 3 + 1}
+                for i in range(6)] + [{'title': 'orphan', 'user_id': 100}])
+
+        with app.app_context():
+            posts: list[Post] = Post.get_all(order_by=Post.id)
+            with db.assert_max_queries(1):
+                cells: list[PostCell] = [Cell.gen(post) for post in posts]
+                jsons: list[dict] = [cell.get_inner_json() for cell in cells]
+
+            assert [j['user'] and j['user']['username'] for j in jsons] == \
+                ['user0', 'user1', 'user2', 'user0', 'user1', 'user2', None]
+
+            # Loaded models are memoized within the request
+            with db.assert_max_queries(0):
+                assert db.load(User, 2).get().username == 'user1'
+                assert [u.username for u in db.load_many(
+                    User, [3, 100, 1]).get()] == ['user2', 'user0']
+            assert db.get_model_loader().query_count == 1
+
+        with app.app_context():
+            assert db.get_model_loader().query_count == 0
+
+    def test_versioning(self, app: Puft, db: Db):
+        client: Any = app.test_client()
+
+        with app.app_context():
+            db.push(Article(title='first'))
+            assert Article.get_first(id=1).version == 1
+
+        response: Any = client.get('/article/1')
+        etag: str = response.headers['ETag']
+        assert response.status_code == 200
+
+        response = client.get('/article/1', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.data == b''
+        # Weakened ETag is matched by If-None-Match only
+        assert client.get(
+            '/article/1',
+            headers={'If-None-Match': f'W/{etag}'}).status_code == 304
+        assert client.put(
+            '/article/1', json={'title': 'second'},
+            headers={'If-Match': f'W/{etag}'}).status_code == 412
+
+        # Failed responses are not tagged
+        response = client.put(
+            '/article/1', json={'title': ''}, headers={'If-Match': etag})
+        assert response.status_code == 400
+        assert 'ETag' not in response.headers
+
+        response = client.put(
+            '/article/1', json={'title': 'second'},
+            headers={'If-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+        # Stale ETag doesn't match any more
+        response = client.put(
+            '/article/1', json={'title': 'third'},
+            headers={'If-Match': etag})
+        assert response.status_code == 412
+        assert client.get(
+            '/article/1', headers={'If-None-Match': etag}).json == \
+            {'title': 'second'}
+
+        with app.app_context():
+            article: Article = Article.get_first(id=1)
+            assert article.version == 2
+
+            # Concurrent update is detected on flush
+            Article.update_all({'title': 'other'}, id=1)
+            assert Article.get_first(id=1).version == 3
+            with db.native_db.engine.begin() as connection:
+                connection.execute(
+                    Article.__table__.update().values(version=4))
+            article.title = 'mine'
+            with pytest.raises(sa.orm.exc.StaleDataError):
+                db.commit()
+            db.rollback()
+
+    def test_search(self, app: Puft, db: Db):
+        with app.app_context():
+            Document.create_many([
+                {'title': 'Cooking', 'body': 'Pasta with tomato sauce',
+                    'category': 'food'},
+                {'title': 'Tomato', 'body': 'Tomato is a red fruit',
+                    'category': 'food'},
+                {'title': 'Gardening', 'body': 'How to grow tomato plants',
+                    'category': 'garden'}])
+
+            assert [d.title for d in Document.search('tomato')] == \
+                ['Tomato', 'Cooking', 'Gardening']
+            assert [d.title for d in Document.search('TOMATO', limit=1)] == \
+                ['Tomato']
+            assert [d.title for d in Document.search(
+                'tomato', category='garden')] == ['Gardening']
+            assert [d.title for d in Document.search('tomato sauce')] == \
+                ['Cooking']
+            # Operators of the index are not interpreted
+            assert Document.search('tomato OR "apple') == []
+            assert Document.search(' ') == []
+
+            document: Document = Document.get_first(title='Gardening')
+            document.body = 'How to grow apple trees'
+            db.commit()
+            assert [d.title for d in Document.search('apple')] == \
+                ['Gardening']
+            assert len(Document.search('tomato', rank=False)) == 2
+
+            Document.update_all({'body': 'Nothing'}, category='food')
+            assert [d.title for d in Document.search('tomato')] == \
+                ['Tomato']
+            assert Document.del_all(title='Gardening') == 1
+            assert Document.search('apple') == []
+
+            with pytest.raises(AttributeError):
+                User.search('user')
+
+    def test_search_migration(self, app: Puft, db: Db):
+        search_index: SearchIndex = Document.__search_index__
+        with app.app_context(), db.native_db.engine.begin() as connection:
+            context: MigrationContext = MigrationContext.configure(
+                connection,
+                opts={'include_object': include_search_object})
+
+            # Structures of the existing index are not dropped
+            upgrade_ops: Any = produce_migrations(
+                context, db.native_db.metadata).upgrade_ops
+            assert 'document_search' not in render_python_code(upgrade_ops)
+
+            for statement in search_index.get_drop_statements('sqlite'):
+                connection.exec_driver_sql(statement)
+            assert not search_index.exists(connection)
+
+            upgrade_ops = produce_migrations(
+                context, db.native_db.metadata).upgrade_ops
+            assert [
+                type(op) for op in upgrade_ops.ops
+                if isinstance(op, (CreateSearchIndexOp, DropSearchIndexOp))
+            ] == [CreateSearchIndexOp]
+            code: str = render_python_code(upgrade_ops)
+            assert "op.execute('CREATE VIRTUAL TABLE IF NOT EXISTS" \
+                ' "document_search"' in code
+            assert 'DROP TABLE IF EXISTS "document_search"' \
+                in render_python_code(upgrade_ops.reverse())
+
+            for statement in search_index.get_create_statements('sqlite'):
+                connection.exec_driver_sql(statement)
+            assert search_index.exists(connection)
+
+    def test_search_postgresql(self):
+        statement: Any = Document.__search_index__.apply(
+            sa.select(Document), 'tomato', 'postgresql')
+        sql: str = str(statement.compile(dialect=postgresql.dialect()))
+
+        tsvector: str = \
+            "to_tsvector('english', coalesce(\"document\".\"title\", '')" \
+            " || ' ' || coalesce(\"document\".\"body\", ''))"
+        assert f'WHERE {tsvector} @@ plainto_tsquery(' in sql
+        assert f'ORDER BY ts_rank({tsvector}, plainto_tsquery(' in sql
+
+    def test_search_language(self):
+        with pytest.raises(ValueError):
+            SearchIndex(
+                Document.__table__, [Document.__table__.c.title],
+                Document.__table__.c.id, language="english', title) --")
+
+    def test_advise_indexes(self, app: Puft, db: Db, tmp_path: Any):
+        directory: str = str(tmp_path / 'migrations')
+        db.index_advisor = IndexAdvisor(path=str(tmp_path / 'shapes.json'))
+        try:
+            with app.app_context():
+                User.get_all(id=1)
+                User.get_all(type='advanced_user')
+                Post.get_all(user_id=1, order_by=Post.title)
+                AdvancedUser.get_all(badge_id=1, username='alice')
+                Event.get_all(tenant='first', name='start')
+
+                advices: list[Any] = db.advise_indexes(
+                    directory=directory, is_dry=True)
+                advised: set[tuple[str, tuple[str, ...], str]] = {
+                    (a.table, tuple(a.columns), a.reason) for a in advices}
+                assert {
+                    ('post', ('user_id', 'title'), 'query'),
+                    # Single table inheritance model's columns are of
+                    # the base table
+                    ('user', ('badge_id', 'username'), 'query'),
+                    ('post_tag', ('tag_id',), 'foreign key'),
+                    ('event', ('name', 'tenant'), 'query'),
+                } <= advised
+                assert not any(
+                    t == 'user' and c[0] in ('id', 'type')
+                    or t == 'post' and c == ('user_id',)
+                    for t, c, _ in advised)
+
+                db.init_migration(directory=directory)
+                db.advise_indexes(directory=directory)
+                script: str = next(
+                    (tmp_path / 'migrations' / 'versions').glob('*.py')
+                ).read_text()
+                assert "op.create_index('ix_post_user_id_title', 'post'," \
+                    " ['user_id', 'title'], unique=False)" in script
+                assert "op.drop_index('ix_post_user_id_title'," \
+                    " table_name='post')" in script
+
+                db.upgrade_migration(directory=directory)
+                assert db.advise_indexes(directory=directory) == []
+        finally:
+            db.index_advisor = None
+
+    def test_counter_cache(self, app: Puft, db: Db):
+        with app.app_context():
+            alice: Author = Author(name='alice')
+            bob: Author = Author(name='bob')
+            db.native_db.session.add_all([alice, bob])
+            db.commit()
+            assert alice.books_count == 0
+
+            alice.books.append(Book(title='First'))
+            alice.books.append(Book(title='Second'))
+            db.commit()
+            assert alice.books_count == 2
+
+            book: Book = Book.get_first(title='Second')
+            book.author = bob
+            db.commit()
+            assert (alice.books_count, bob.books_count) == (1, 1)
+
+            db.native_db.session.delete(book)
+            db.commit()
+            assert bob.books_count == 0
+
+            # Bulk and set-based writes are recounted
+            Book.create_many(
+                [{'title': f'Bulk {i}', 'author_id': bob.id}
+                    for i in range(3)])
+            assert bob.books_count == 3
+            Book.update_all({'author_id': alice.id}, title='Bulk 0')
+            assert (alice.books_count, bob.books_count) == (2, 2)
+            assert Book.del_all(author_id=bob.id) == 2
+            assert (alice.books_count, bob.books_count) == (2, 0)
+
+            with db.profile_queries() as profile:
+                assert Author.get_first(name='alice').books_count == 2
+            assert profile.query_count == 1
+
+            with db.native_db.engine.begin() as connection:
+                connection.execute(sa.text(
+                    'UPDATE author SET books_count = 10'))
+            assert db.recount(['Author.books_count']) == {
+                'Author.books_count': 2}
+            assert [a.books_count for a in Author.get_all(order_by=Author.id)] \
+                == [2, 0]
+            with pytest.raises(ValueError):
+                db.recount(['Author.unknown_count'])
+
+
+class TestDbTransactionIsolation(Test):
+    db_isolation = DbIsolationEnum.TRANSACTION
+
+    @fixture
+    def app(self, assembler_test: Assembler):
+        app: Puft = assembler_test.get_puft()
+        yield app
+
+    def test_commit(self, app: Puft, db: Db):
+        with app.app_context():
+            db.push(User(username='first'))
+            Event.create(tenant='a', name='event')
+            with pytest.raises(ValueError):
+                with db.transaction():
+                    db.push(User(username='second'))
+                    raise ValueError
+            db.push(User(username='third'))
+
+        with app.app_context():
+            assert [u.username for u in User.get_all(order_by=User.id)] == \
+                ['first', 'third']
+            assert Event.count() == 1
+
+    def test_rolled_back(self, app: Puft):
+        # Scopes are opened by the test itself to not depend on tests order
+        db: Db = Db.instance()
+        with db.isolate_test(app.get_native_app(), self.db_isolation):
+            with app.app_context():
+                db.push(User(username='first'))
+                Event.create(tenant='a', name='event')
+                assert User.count() == 1
+
+        with db.isolate_test(app.get_native_app(), self.db_isolation):
+            with app.app_context():
+                assert User.count() == 0
+                assert Event.count() == 0
+
+
+class TestDbSnapshotIsolation(TestDbTransactionIsolation):
+    db_isolation = DbIsolationEnum.SNAPSHOT
+
+    def test_committed_by_engine(self, app: Puft, db: Db):
+        with app.app_context():
+            with db.native_db.engine.begin() as connection:
+                connection.execute(
+                    User.__table__.insert(), [{'username': 'first'}])
+            assert User.count() == 1
+
+    def test_rolled_back_by_engine(self, app: Puft):
+        db: Db = Db.instance()
+        with db.isolate_test(app.get_native_app(), self.db_isolation):
+            with app.app_context():
+                with db.native_db.engine.begin() as connection:
+                    connection.execute(
+                        User.__table__.insert(), [{'username': 'first'}])
+                assert User.count() == 1
+
+        with db.isolate_test(app.get_native_app(), self.db_isolation):
+            with app.app_context():
+                assert User.count() == 0
@@ -0,0 +1,9 @@
+from enum import Enum
+
+
+class FixtureFormatEnum(Enum):
+    YAML = "yaml"
+    YML = "yml"
+    JSON = "json"
+    CSV = "csv"
+    NDJSON = "ndjson"
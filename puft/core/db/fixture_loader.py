@@ -0,0 +1,374 @@
+from __future__ import annotations
+import io
+import os
+import csv
+import json
+import datetime
+from typing import Any
+
+import yaml
+import sqlalchemy as sa
+
+from .fixture_format_enum import FixtureFormatEnum
+
+
+class FixtureLoader:
+    """Bulk loader of fixture files into tables of given metadata.
+
+    Table of rows is given by fixture file name, e.g. `user.csv` or
+    `post.ndjson`. YAML and JSON files contain list of rows or mapping of
+    table names to lists of rows, so several tables can be placed in one
+    file.
+
+    Rows can be labeled by `_ref` field to be referenced by foreign key
+    fields of other rows (in any file) as `@<label>`. Primary keys of rows
+    without given ones are assigned by loader for single integer primary
+    keys, so references are resolved before writing and all rows are
+    written without fetching generated keys back:
+    ```yaml
+    # user.yaml
+    - _ref: alice
+      username: alice
+    # post.yaml
+    - title: Hello
+      author_id: '@alice'
+    ```
+
+    Tables are written in dependency order within one transaction: by COPY
+    on PostgreSQL and by executemany INSERT on other dialects.
+
+    Values absent in rows are taken from `defaults_by_table` if given, e.g.
+    polymorphic identities of the base models.
+    """
+    REF_FIELD = '_ref'
+    REF_PREFIX = '@'
+
+    def __init__(
+            self,
+            metadata: sa.MetaData,
+            defaults_by_table: dict[str, dict[str, Any]] | None = None) -> None:
+        self.metadata = metadata
+        self.defaults_by_table = defaults_by_table or {}
+
+    def read(self, path: str) -> dict[str, list[dict[str, Any]]]:
+        """Read fixture file or all fixture files of given directory and
+        return rows by table names.
+
+        Raise:
+            ValueError:
+                File has unsupported extension or its table is unknown.
+        """
+        file_paths: list[str]
+        if os.path.isdir(path):
+            file_paths = sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if self._get_format(name) is not None)
+        else:
+            file_paths = [path]
+
+        rows_by_table: dict[str, list[dict[str, Any]]] = {}
+        for file_path in file_paths:
+            for table_name, rows in self._read_file(file_path).items():
+                if table_name not in self.metadata.tables:
+                    raise ValueError(
+                        f'Unknown table {table_name} of fixture {file_path}')
+                rows_by_table.setdefault(table_name, []).extend(rows)
+        return rows_by_table
+
+    def load(
+            self,
+            connection: Any,
+            rows_by_table: dict[str, list[dict[str, Any]]]) -> dict[str, int]:
+        """Write given rows by tables using given connection and return
+        count of written rows by table names.
+
+        Connection's transaction is not committed by loader.
+        """
+        tables: list[sa.Table] = [
+            t for t in self.metadata.sorted_tables if t.name in rows_by_table]
+
+        # Assign primary keys of all tables before resolving references,
+        # since dependent rows may precede referenced ones in sort order of
+        # cyclic dependencies
+        refs: dict[str, dict[str, Any]] = {}
+        rows_by_table = dict(rows_by_table)
+        for table in tables:
+            rows_by_table[table.name] = self._assign_primary_keys(
+                connection, table, rows_by_table[table.name],
+                refs.setdefault(table.name, {}))
+
+        counts: dict[str, int] = {}
+        for table in tables:
+            defaults: dict[str, Any] = self.defaults_by_table.get(
+                table.name, {})
+            rows: list[dict[str, Any]] = [
+                self._prepare_row(table, {**defaults, **row}, refs)
+                for row in rows_by_table[table.name]]
+            if not rows:
+                continue
+            rows = self._normalize_rows(table, rows)
+
+            if connection.dialect.name == 'postgresql':
+                self._copy(connection, table, rows)
+            else:
+                connection.execute(table.insert(), rows)
+            counts[table.name] = len(rows)
+
+        return counts
+
+    def _read_file(self, file_path: str) -> dict[str, list[dict[str, Any]]]:
+        format_enum: FixtureFormatEnum | None = self._get_format(file_path)
+        if format_enum is None:
+            raise ValueError(f'Unsupported fixture file format: {file_path}')
+        table_name: str = os.path.basename(file_path).split('.')[0]
+
+        with open(file_path, 'r', newline='') as file:
+            if format_enum is FixtureFormatEnum.CSV:
+                return {table_name: [
+                    {k: self._parse_csv_value(v) for k, v in row.items()}
+                    for row in csv.DictReader(file)]}
+            elif format_enum is FixtureFormatEnum.NDJSON:
+                return {table_name: [
+                    json.loads(line) for line in file if line.strip()]}
+
+            data: Any
+            if format_enum is FixtureFormatEnum.JSON:
+                data = json.load(file)
+            else:
+                data = yaml.safe_load(file)
+
+        if data is None:
+            return {}
+        elif type(data) is list:
+            return {table_name: data}
+        elif type(data) is dict:
+            return data
+        else:
+            raise TypeError(
+                f'Fixture {file_path} should contain list of rows or mapping'
+                ' of table names to lists of rows')
+
+    @staticmethod
+    def _get_format(file_path: str) -> FixtureFormatEnum | None:
+        extension: str = os.path.splitext(file_path)[1].lstrip('.').lower()
+        try:
+            return FixtureFormatEnum(extension)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _parse_csv_value(value: str) -> Any:
+        # CSV has no nulls, so empty cells are considered as them
+        if value == '':
+            return None
+        return value
+
+    def _assign_primary_keys(
+            self,
+            connection: Any,
+            table: sa.Table,
+            rows: list[dict[str, Any]],
+            refs: dict[str, Any]) -> list[dict[str, Any]]:
+        """Assign primary keys to rows without them, if table has single
+        integer primary key, and remember primary keys of labeled rows.
+        """
+        primary_keys: list[sa.Column] = list(table.primary_key.columns)
+        primary_key: sa.Column | None = None
+        if len(primary_keys) == 1:
+            primary_key = primary_keys[0]
+        is_assignable: bool = \
+            primary_key is not None \
+            and isinstance(primary_key.type, sa.Integer) \
+            and not primary_key.foreign_keys
+
+        next_value: int | None = None
+        assigned_rows: list[dict[str, Any]] = []
+        for row in rows:
+            row = dict(row)
+            label: Any = row.pop(self.REF_FIELD, None)
+
+            if is_assignable and row.get(primary_key.key, None) is None:
+                if next_value is None:
+                    next_value = self._get_next_primary_key(
+                        connection, primary_key, rows)
+                row[primary_key.key] = next_value
+                next_value += 1
+
+            if label is not None:
+                if primary_key is None:
+                    raise ValueError(
+                        f'Rows of table {table.name} with composite primary'
+                        ' key can\'t be referenced')
+                if label in refs:
+                    raise ValueError(
+                        f'Duplicate reference {label} in table {table.name}')
+                # Value can be a reference itself, e.g. for joined
+                # inheritance tables
+                refs[label] = row.get(primary_key.key, None)
+            assigned_rows.append(row)
+
+        return assigned_rows
+
+    @staticmethod
+    def _get_next_primary_key(
+            connection: Any,
+            primary_key: sa.Column,
+            rows: list[dict[str, Any]]) -> int:
+        max_value: int | None = connection.execute(
+            sa.select(sa.func.max(primary_key))).scalar()
+        given_values: list[int] = [
+            int(row[primary_key.key]) for row in rows
+            if type(row.get(primary_key.key, None)) in (int, str)
+            and str(row[primary_key.key]).isdigit()]
+        return max([max_value or 0, *given_values]) + 1
+
+    def _prepare_row(
+            self,
+            table: sa.Table,
+            row: dict[str, Any],
+            refs: dict[str, dict[str, Any]]) -> dict[str, Any]:
+        prepared_row: dict[str, Any] = {}
+        for key, value in row.items():
+            if key not in table.columns:
+                raise ValueError(f'Unknown column {key} of table {table.name}')
+            column: sa.Column = table.columns[key]
+
+            if column.foreign_keys and type(value) is str \
+                    and value.startswith(self.REF_PREFIX):
+                value = self._resolve_ref(column, value[1:], refs)
+            prepared_row[key] = self._convert_value(column, value)
+        return prepared_row
+
+    def _resolve_ref(
+            self,
+            column: sa.Column,
+            label: str,
+            refs: dict[str, dict[str, Any]]) -> Any:
+        for foreign_key in column.foreign_keys:
+            table_name: str = foreign_key.column.table.name
+            if label not in refs.get(table_name, {}):
+                continue
+
+            value: Any = refs[table_name][label]
+            # Follow references of primary keys given as references
+            if type(value) is str and value.startswith(self.REF_PREFIX):
+                return self._resolve_ref(
+                    foreign_key.column, value[1:], refs)
+            return value
+
+        raise ValueError(
+            f'Unknown reference {self.REF_PREFIX}{label} of column'
+            f' {column.table.name}.{column.key}')
+
+    @staticmethod
+    def _convert_value(column: sa.Column, value: Any) -> Any:
+        """Convert value read from text formats to column's Python type."""
+        if type(value) is not str:
+            return value
+
+        python_type: type
+        try:
+            python_type = column.type.python_type
+        except NotImplementedError:
+            return value
+
+        if python_type is bool:
+            return value.lower() in ('1', 'true', 't', 'yes', 'y')
+        elif python_type in (int, float):
+            return python_type(value)
+        elif python_type is datetime.datetime:
+            return datetime.datetime.fromisoformat(value)
+        elif python_type is datetime.date:
+            return datetime.date.fromisoformat(value)
+        return value
+
+    @staticmethod
+    def _normalize_rows(
+            table: sa.Table,
+            rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Return rows with the same keys, filling absent values by
+        columns' client side defaults.
+
+        Executemany and COPY both write the same columns for all rows, and
+        COPY doesn't apply client side defaults by itself.
+        """
+        keys: set[str] = set().union(*rows)
+        for column in table.columns:
+            if column.default is not None and (
+                    column.default.is_scalar or column.default.is_callable):
+                keys.add(column.key)
+
+        normalized_rows: list[dict[str, Any]] = []
+        for row in rows:
+            normalized_row: dict[str, Any] = {}
+            for key in keys:
+                if key in row:
+                    normalized_row[key] = row[key]
+                    continue
+
+                default: Any = table.columns[key].default
+                if default is None:
+                    normalized_row[key] = None
+                elif default.is_scalar:
+                    normalized_row[key] = default.arg
+                elif default.is_callable:
+                    # SQLAlchemy wraps defaults to accept execution context
+                    normalized_row[key] = default.arg(None)
+                else:
+                    normalized_row[key] = None
+            normalized_rows.append(normalized_row)
+        return normalized_rows
+
+    def _copy(
+            self,
+            connection: Any,
+            table: sa.Table,
+            rows: list[dict[str, Any]]) -> None:
+        """Write rows by PostgreSQL COPY in text format and move serial
+        sequence of the table after written primary keys.
+        """
+        keys: list[str] = list(rows[0])
+        buffer: io.StringIO = io.StringIO()
+        for row in rows:
+            buffer.write('\t'.join(
+                self._format_copy_value(row[key]) for key in keys))
+            buffer.write('\n')
+        buffer.seek(0)
+
+        preparer: Any = connection.dialect.identifier_preparer
+        columns: str = ', '.join(
+            preparer.quote(table.columns[key].name) for key in keys)
+        cursor: Any = connection.connection.cursor()
+        try:
+            cursor.copy_expert(
+                f'COPY {preparer.format_table(table)} ({columns})'
+                ' FROM STDIN',
+                buffer)
+        finally:
+            cursor.close()
+
+        for column in table.primary_key.columns:
+            if isinstance(column.type, sa.Integer) \
+                    and column.autoincrement in (True, 'auto') \
+                    and not column.foreign_keys:
+                connection.execute(
+                    sa.select(sa.func.setval(
+                        sa.func.pg_get_serial_sequence(
+                            preparer.format_table(table), column.name),
+                        sa.select(sa.func.max(column)).scalar_subquery())))
+
+    @staticmethod
+    def _format_copy_value(value: Any) -> str:
+        if value is None:
+            return '\\N'
+        elif type(value) is bool:
+            return 't' if value else 'f'
+        elif isinstance(value, (datetime.date, datetime.datetime)):
+            return value.isoformat()
+        elif isinstance(value, (dict, list)):
+            value = json.dumps(value)
+        return str(value) \
+            .replace('\\', '\\\\') \
+            .replace('\t', '\\t') \
+            .replace('\n', '\\n') \
+            .replace('\r', '\\r')
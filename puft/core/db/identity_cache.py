@@ -0,0 +1,166 @@
+from __future__ import annotations
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any
+
+import sqlalchemy as sa
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.session import make_transient_to_detached
+
+
+class IdentityCache:
+    """Read-through cache of model column snapshots for one table keyed by
+    primary key.
+
+    Snapshots instead of model instances are held, since instances are bound
+    to sessions which are removed after each app context. On hit, snapshot
+    is restored to a persistent model of the current session without
+    SELECT.
+
+    Evicts least recently used entries if `max_size` exceeded and entries
+    older than `ttl` seconds on access.
+
+    Entries are invalidated by Db through session events, see
+    `Db._invalidate_caches_on_flush()`.
+    """
+    DEFAULT_MAX_SIZE = 1000
+    DEFAULT_TTL = 60
+
+    def __init__(
+            self,
+            table_name: str,
+            max_size: int = DEFAULT_MAX_SIZE,
+            ttl: float | None = DEFAULT_TTL) -> None:
+        if max_size < 1:
+            raise ValueError(
+                f'Identity cache max size should be positive, got {max_size}')
+
+        self.table_name = table_name
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+        # Values are tuples (model class, snapshot, expiration time)
+        self._entries: OrderedDict[Any, tuple[type, dict, float | None]] = \
+            OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def parse_primary_key(Model: Any, kwargs: dict[str, Any]) -> Any:
+        """Return primary key value if given filter kwargs select model only
+        by its primary key, otherwise return None.
+
+        Value is coerced to primary key column's python type, so e.g. string
+        ids from routes hit the same entries as integer ones.
+        """
+        if len(kwargs) != 1:
+            return None
+
+        mapper: Any = sa.inspect(Model)
+        column: Any = mapper.primary_key[0]
+        key: str = mapper.get_property_by_column(column).key
+
+        if key not in kwargs or kwargs[key] is None:
+            return None
+
+        value: Any = kwargs[key]
+        try:
+            python_type: type = column.type.python_type
+        except NotImplementedError:
+            return value
+
+        if type(value) is python_type:
+            return value
+        try:
+            return python_type(value)
+        except (TypeError, ValueError):
+            return None
+
+    def load(self, session: Any, Model: Any, primary_key: Any) -> Any:
+        """Return persistent in given session model of type `Model` restored
+        from cache or None if there is no suitable entry.
+        """
+        with self._lock:
+            entry = self._entries.get(primary_key, None)
+
+            if entry is not None and self._is_expired(entry):
+                del self._entries[primary_key]
+                self.evictions += 1
+                entry = None
+
+            # Entry of another polymorphic class sharing the table is not
+            # suitable, query decides if it's absent or not
+            if entry is None or not issubclass(entry[0], Model):
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(primary_key)
+            self.hits += 1
+            model_class, snapshot, _ = entry
+
+        mapper: Any = sa.inspect(model_class)
+        identity_key: Any = mapper.identity_key_from_primary_key(
+            [primary_key])
+
+        # Model already presented in the session may contain unflushed
+        # changes, so it takes priority
+        model: Any = session.identity_map.get(identity_key, None)
+        if model is not None:
+            return model
+
+        model = mapper.class_manager.new_instance()
+        for key, value in snapshot.items():
+            set_committed_value(model, key, value)
+        make_transient_to_detached(model)
+        session.add(model)
+
+        return model
+
+    def store(self, model: Any) -> None:
+        """Save snapshot of loaded column attributes of given model."""
+        state: Any = sa.inspect(model)
+        primary_key: Any = state.identity[0]
+        snapshot: dict[str, Any] = {
+            attr.key: state.dict[attr.key]
+            for attr in state.mapper.column_attrs
+            if attr.key in state.dict}
+
+        expires_at: float | None = None
+        if self.ttl is not None:
+            expires_at = time.monotonic() + self.ttl
+
+        with self._lock:
+            self._entries[primary_key] = (type(model), snapshot, expires_at)
+            self._entries.move_to_end(primary_key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, primary_key: Any) -> None:
+        with self._lock:
+            self._entries.pop(primary_key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict[str, int]:
+        """Return counters of the cache."""
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+    def _is_expired(self, entry: tuple[type, dict, float | None]) -> bool:
+        expires_at: float | None = entry[2]
+        return expires_at is not None and expires_at <= time.monotonic()
@@ -0,0 +1,299 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+from typing import Any
+
+import sqlalchemy as sa
+
+
+class IndexAdvice:
+    """Index missing for observed query shapes or for a foreign key."""
+    # Max length of identifiers in PostgreSQL
+    MAX_NAME_LENGTH = 63
+
+    def __init__(
+            self,
+            table: str,
+            columns: list[str],
+            reason: str,
+            count: int = 0) -> None:
+        self.table = table
+        self.columns = columns
+        self.reason = reason
+        # Count of observed queries the index is advised for
+        self.count = count
+
+    @property
+    def name(self) -> str:
+        name: str = f'ix_{self.table}_{"_".join(self.columns)}'
+        if len(name) > self.MAX_NAME_LENGTH:
+            digest: str = hashlib.sha1(name.encode()).hexdigest()[:8]
+            name = f'{name[:self.MAX_NAME_LENGTH - 9]}_{digest}'
+        return name
+
+    def __repr__(self) -> str:
+        return f'IndexAdvice({self.table}, {self.columns}, {self.reason})'
+
+
+class IndexAdvisor:
+    """Records shapes of Mapper's read queries and advises indexes missing
+    for them.
+
+    Shape of a query is its table, columns compared by equality and
+    columns it's ordered by, values are not recorded. Shapes are counted in
+    memory and merged into JSON file at `path` by `save()`, so shapes of
+    several runs of the app or the test suite are accumulated.
+
+    Shape is considered covered if some index of the table starts with its
+    equality columns in any order (or with its first order column if
+    there are no equality columns). Lookups by primary key or by all
+    columns of unique constraint are always covered. Foreign keys not
+    leading any index are advised regardless of observed shapes, since
+    they are used by relationship loads and joins.
+    """
+    DEFAULT_MIN_COUNT = 1
+
+    def __init__(
+            self,
+            path: str,
+            min_count: int = DEFAULT_MIN_COUNT) -> None:
+        self.path = path
+        # Shapes observed less times are not advised
+        self.min_count = min_count
+
+        self._lock = threading.Lock()
+        # Counts by shapes (table, equality columns, order columns)
+        self._counts: dict[tuple[str, tuple[str, ...], tuple[str, ...]], int] \
+            = {}
+
+    def record_query(
+            self,
+            Model: Any,
+            filters: dict[str, Any],
+            order_by: object | list[object] | None = None) -> None:
+        """Record shape of the query of given model class.
+
+        Columns are grouped by tables they belong to, so queries of joined
+        inheritance models produce shape per table. Filters by not column
+        attributes and orders by not column expressions are ignored.
+        """
+        mapper: Any = sa.inspect(Model)
+        filter_columns: list[sa.Column] = []
+        for key in filters:
+            attr: Any = mapper.column_attrs.get(key, None)
+            if attr is not None:
+                filter_columns.append(attr.columns[0])
+
+        order_columns: list[sa.Column] = []
+        order_by_items: list[Any] = []
+        if order_by is not None:
+            order_by_items = \
+                order_by if type(order_by) is list else [order_by]  # type: ignore
+        for item in order_by_items:
+            if isinstance(item, sa.sql.expression.UnaryExpression):
+                item = item.element
+            if hasattr(item, '__clause_element__'):
+                item = item.__clause_element__()
+            if isinstance(item, sa.Column) \
+                    and isinstance(item.table, sa.Table):
+                order_columns.append(item)
+
+        tables: dict[str, None] = {
+            c.table.name: None for c in filter_columns + order_columns}
+        for table in tables:
+            self.record(
+                table,
+                [c.name for c in filter_columns if c.table.name == table],
+                [c.name for c in order_columns if c.table.name == table])
+
+    def record(
+            self,
+            table: str,
+            filter_columns: list[str],
+            order_columns: list[str]) -> None:
+        """Record shape of the query of given table."""
+        key: tuple[str, tuple[str, ...], tuple[str, ...]] = (
+            table,
+            tuple(sorted(set(filter_columns))),
+            tuple(dict.fromkeys(order_columns)))
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def save(self) -> None:
+        """Merge recorded shapes into the file and forget them."""
+        with self._lock:
+            counts = self._counts
+            self._counts = {}
+        if not counts:
+            return
+
+        for key, count in self._read().items():
+            counts[key] = counts.get(key, 0) + count
+        directory: str = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'w') as file:
+            json.dump([
+                {
+                    'table': table,
+                    'filters': list(filter_columns),
+                    'order': list(order_columns),
+                    'count': count
+                }
+                for (table, filter_columns, order_columns), count
+                in sorted(counts.items())], file, indent=2)
+
+    def get_shapes(
+            self) -> dict[tuple[str, tuple[str, ...], tuple[str, ...]], int]:
+        """Return counts by shapes of the file and not saved ones."""
+        counts = self._read()
+        with self._lock:
+            for key, count in self._counts.items():
+                counts[key] = counts.get(key, 0) + count
+        return counts
+
+    def reset(self) -> None:
+        """Forget all recorded shapes including saved ones."""
+        with self._lock:
+            self._counts = {}
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
+    def _read(
+            self) -> dict[tuple[str, tuple[str, ...], tuple[str, ...]], int]:
+        if not os.path.isfile(self.path):
+            return {}
+        with open(self.path, 'r') as file:
+            return {
+                (
+                    shape['table'], tuple(shape['filters']),
+                    tuple(shape['order'])): shape['count']
+                for shape in json.load(file)}
+
+    def advise(
+            self,
+            tables: list[sa.Table],
+            inspector: Any = None) -> list[IndexAdvice]:
+        """Return indexes missing for given tables.
+
+        Args:
+            tables:
+                Tables to check.
+            inspector (optional):
+                SQLAlchemy inspector of the database, its indexes are
+                considered existing as well, so indexes created by applied
+                migrations but not declared by models are not advised again.
+        """
+        shapes = self.get_shapes()
+        advices: list[IndexAdvice] = []
+
+        for table in tables:
+            indexes: list[list[str]] = self._get_index_columns(
+                table, inspector)
+            unique_sets: list[set[str]] = self._get_unique_column_sets(table)
+
+            candidates: list[IndexAdvice] = []
+            for (table_name, filter_columns, order_columns), count \
+                    in sorted(shapes.items()):
+                if table_name != table.name or count < self.min_count \
+                        or any(c not in table.c for c in filter_columns) \
+                        or any(c not in table.c for c in order_columns):
+                    continue
+                if self._is_shape_covered(
+                        filter_columns, order_columns, indexes, unique_sets):
+                    continue
+                columns: list[str] = list(filter_columns) + [
+                    c for c in order_columns if c not in filter_columns]
+                candidates.append(IndexAdvice(
+                    table.name, columns, 'query', count=count))
+
+            for column in table.columns:
+                if column.foreign_keys:
+                    candidates.append(IndexAdvice(
+                        table.name, [column.name], 'foreign key'))
+
+            # Longer indexes go first to cover their prefixes
+            accepted: list[IndexAdvice] = []
+            for candidate in sorted(
+                    candidates, key=lambda c: -len(c.columns)):
+                if any(
+                        index[:len(candidate.columns)] == candidate.columns
+                        for index in indexes + [a.columns for a in accepted]):
+                    continue
+                accepted.append(candidate)
+            advices.extend(sorted(accepted, key=lambda a: a.columns))
+
+        return advices
+
+    def render_operations(
+            self, advices: list[IndexAdvice]) -> tuple[str, str]:
+        """Return Alembic operations upgrading and downgrading given advices,
+        indented as bodies of migration functions.
+        """
+        if not advices:
+            return 'pass', 'pass'
+        upgrades: list[str] = [
+            f'op.create_index({a.name!r}, {a.table!r}, {a.columns!r},'
+            ' unique=False)'
+            for a in advices]
+        downgrades: list[str] = [
+            f'op.drop_index({a.name!r}, table_name={a.table!r})'
+            for a in reversed(advices)]
+        return '\n    '.join(upgrades), '\n    '.join(downgrades)
+
+    @staticmethod
+    def _is_shape_covered(
+            filter_columns: tuple[str, ...],
+            order_columns: tuple[str, ...],
+            indexes: list[list[str]],
+            unique_sets: list[set[str]]) -> bool:
+        if not filter_columns:
+            return not order_columns or any(
+                index[0] == order_columns[0] for index in indexes)
+        if any(unique_set <= set(filter_columns) for unique_set in unique_sets):
+            return True
+        return any(
+            set(index[:len(filter_columns)]) == set(filter_columns)
+            for index in indexes)
+
+    @staticmethod
+    def _get_index_columns(
+            table: sa.Table, inspector: Any = None) -> list[list[str]]:
+        """Return column names of table's indexes, primary key and unique
+        constraints.
+        """
+        indexes: list[list[str]] = [[c.name for c in table.primary_key]]
+        indexes.extend(
+            [c.name for c in index.columns] for index in table.indexes)
+        indexes.extend(
+            [c.name for c in constraint.columns]
+            for constraint in table.constraints
+            if isinstance(constraint, sa.UniqueConstraint))
+
+        if inspector is not None and inspector.has_table(table.name):
+            indexes.extend(
+                list(index['column_names'])
+                for index in inspector.get_indexes(table.name))
+            indexes.extend(
+                list(constraint['column_names'])
+                for constraint in inspector.get_unique_constraints(table.name))
+
+        # Expression indexes have no column names
+        return [
+            index for index in indexes
+            if index and all(c is not None for c in index)]
+
+    @staticmethod
+    def _get_unique_column_sets(table: sa.Table) -> list[set[str]]:
+        unique_sets: list[set[str]] = [{c.name for c in table.primary_key}]
+        unique_sets.extend(
+            {c.name for c in constraint.columns}
+            for constraint in table.constraints
+            if isinstance(constraint, sa.UniqueConstraint))
+        unique_sets.extend(
+            {c.name for c in index.columns}
+            for index in table.indexes if index.unique)
+        unique_sets.extend({c.name} for c in table.columns if c.unique)
+        return [s for s in unique_sets if s]
@@ -0,0 +1,88 @@
+import sqlalchemy as sa
+
+from puft.core.db.index_advisor import IndexAdvisor
+
+
+def make_tables() -> tuple[sa.Table, sa.Table]:
+    metadata = sa.MetaData()
+    author = sa.Table(
+        'author', metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('email', sa.String(50), unique=True),
+        sa.Column('name', sa.String(50), index=True))
+    book = sa.Table(
+        'book', metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('author_id', sa.Integer, sa.ForeignKey('author.id')),
+        sa.Column('title', sa.String(50)),
+        sa.Column('year', sa.Integer))
+    return author, book
+
+
+class TestIndexAdvisor():
+    def test_advise(self, tmp_path):
+        author, book = make_tables()
+        advisor = IndexAdvisor(path=str(tmp_path / 'shapes.json'))
+        advisor.record('author', ['id'], [])
+        advisor.record('author', ['email'], [])
+        advisor.record('author', ['name'], ['id'])
+        advisor.record('book', ['year', 'author_id'], ['title'])
+        advisor.record('book', [], ['title'])
+
+        advices = advisor.advise([author, book])
+
+        assert [(a.table, a.columns, a.reason) for a in advices] == [
+            ('book', ['author_id', 'year', 'title'], 'query'),
+            ('book', ['title'], 'query')]
+        assert advices[0].name == 'ix_book_author_id_year_title'
+
+    def test_advise_foreign_key(self, tmp_path):
+        _, book = make_tables()
+        advisor = IndexAdvisor(path=str(tmp_path / 'shapes.json'))
+
+        advices = advisor.advise([book])
+
+        assert [(a.columns, a.reason) for a in advices] == [
+            (['author_id'], 'foreign key')]
+
+    def test_min_count(self, tmp_path):
+        _, book = make_tables()
+        advisor = IndexAdvisor(path=str(tmp_path / 'shapes.json'), min_count=2)
+        advisor.record('book', ['title'], [])
+        advisor.record('book', ['year'], [])
+        advisor.record('book', ['year'], [])
+
+        assert [a.columns for a in advisor.advise([book])] == [
+            ['author_id'], ['year']]
+
+    def test_save(self, tmp_path):
+        path = str(tmp_path / 'var' / 'shapes.json')
+        advisor = IndexAdvisor(path=path)
+        advisor.record('book', ['title'], [])
+        advisor.save()
+        advisor.record('book', ['title'], [])
+        advisor.save()
+
+        assert IndexAdvisor(path=path).get_shapes() == {
+            ('book', ('title',), ()): 2}
+
+        advisor.reset()
+        assert advisor.get_shapes() == {}
+
+    def test_render_operations(self, tmp_path):
+        _, book = make_tables()
+        advisor = IndexAdvisor(path=str(tmp_path / 'shapes.json'))
+        advisor.record('book', ['title'], [])
+
+        upgrades, downgrades = advisor.render_operations(
+            advisor.advise([book]))
+
+        assert upgrades == (
+            "op.create_index('ix_book_author_id', 'book', ['author_id'],"
+            " unique=False)\n"
+            "    op.create_index('ix_book_title', 'book', ['title'],"
+            " unique=False)")
+        assert downgrades == (
+            "op.drop_index('ix_book_title', table_name='book')\n"
+            "    op.drop_index('ix_book_author_id', table_name='book')")
+        assert advisor.render_operations([]) == ('pass', 'pass')
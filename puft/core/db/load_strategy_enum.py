@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class LoadStrategyEnum(Enum):
+    SELECTIN = 'selectin'
+    JOINED = 'joined'
+    SUBQUERY = 'subquery'
@@ -0,0 +1,118 @@
+from __future__ import annotations
+from typing import Any, Callable
+
+
+class Deferred:
+    """Value computed on first access by `get()` and memoized."""
+    def __init__(self, resolve: Callable[[], Any]) -> None:
+        self._resolve = resolve
+        self._is_resolved: bool = False
+        self._value: Any = None
+
+    def get(self) -> Any:
+        if not self._is_resolved:
+            self._value = self._resolve()
+            self._is_resolved = True
+            # Release closure holding the loader
+            self._resolve = None  # type: ignore
+        return self._value
+
+    def then(self, fn: Callable[[Any], Any]) -> Deferred:
+        """Return deferred value of given function applied to this value."""
+        return Deferred(lambda: fn(self.get()))
+
+    def __repr__(self) -> str:
+        if self._is_resolved:
+            return f'Deferred({self._value!r})'
+        return 'Deferred(<pending>)'
+
+
+class ModelLoader:
+    """Batching loader of models by primary keys.
+
+    `load()` only remembers requested key and returns deferred model. On
+    first access to any deferred model of some Model class, all pending
+    keys of this class are loaded by one `IN (...)` query (or by one query
+    per `batch_size` keys). Loaded models are memoized for the lifetime of
+    the loader, i.e. for the request if loader is taken from
+    `Db.get_model_loader()`.
+
+    For example, cells of posts with their authors are generated by two
+    queries instead of one query per post:
+    ```python
+    @dataclass
+    class PostCell(Cell):
+        Model = Post
+        title: str
+        user: Any
+
+        @classmethod
+        def gen_instance(cls, post: Post) -> 'PostCell':
+            return cls(
+                id=post.id, type=post.type, title=post.title,
+                user=UserCell.load(post.user_id))
+
+    cells = [Cell.gen(post) for post in Post.get_all()]
+    # User models are loaded at first serialization
+    jsons = [cell.get_json() for cell in cells]
+    ```
+    """
+    def __init__(self, batch_size: int) -> None:
+        if batch_size < 1:
+            raise ValueError(f'Batch size should be positive, got {batch_size}')
+        self.batch_size = batch_size
+
+        self.query_count: int = 0
+
+        # Pending primary keys are held as dict keys to keep their order
+        self._pending_by_model: dict[type, dict[Any, None]] = {}
+        # Models or None for not found ones by their primary keys
+        self._loaded_by_model: dict[type, dict[Any, Any]] = {}
+
+    def load(self, Model: Any, primary_key: Any) -> Deferred:
+        """Return deferred model of given class with given primary key or
+        deferred None if there is no such model.
+        """
+        if primary_key is not None and primary_key not in \
+                self._loaded_by_model.get(Model, {}):
+            self._pending_by_model.setdefault(Model, {})[primary_key] = None
+        return Deferred(lambda: self._get_loaded(Model, primary_key))
+
+    def load_many(self, Model: Any, primary_keys: list[Any]) -> Deferred:
+        """Return deferred list of models with given primary keys in the
+        same order, skipping not found ones.
+        """
+        deferreds: list[Deferred] = [
+            self.load(Model, primary_key) for primary_key in primary_keys]
+        return Deferred(lambda: [
+            model for model in (d.get() for d in deferreds)
+            if model is not None])
+
+    def resolve(self, Model: Any) -> None:
+        """Load all pending models of given class."""
+        pending: list[Any] = list(self._pending_by_model.pop(Model, {}))
+        loaded: dict[Any, Any] = self._loaded_by_model.setdefault(Model, {})
+        primary_key: Any = Model._get_primary_key()
+
+        for ix in range(0, len(pending), self.batch_size):
+            batch: list[Any] = pending[ix:ix + self.batch_size]
+            # Not found keys are memoized as well
+            loaded.update({key: None for key in batch})
+            for model in Model._get_read_query().filter(
+                    primary_key.in_(batch)):
+                loaded[getattr(model, primary_key.key)] = model
+            self.query_count += 1
+
+    def resolve_all(self) -> None:
+        """Load pending models of all classes, e.g. before the end of the
+        request.
+        """
+        for Model in list(self._pending_by_model):
+            self.resolve(Model)
+
+    def _get_loaded(self, Model: Any, primary_key: Any) -> Any:
+        if primary_key is None:
+            return None
+        if Model in self._pending_by_model:
+            self.resolve(Model)
+        return self._loaded_by_model[Model].get(primary_key, None)
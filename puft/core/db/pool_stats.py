@@ -0,0 +1,94 @@
+from __future__ import annotations
+import time
+from threading import Lock
+from typing import Any
+
+import sqlalchemy as sa
+from sqlalchemy.pool import QueuePool
+
+from puft.tools.log import log
+
+
+class PoolStats:
+    """Counters of connection checkouts from the pool.
+
+    Logs its state each `log_interval` seconds on checkouts, if the interval
+    is given.
+    """
+    def __init__(self, log_interval: float | None = None) -> None:
+        self.log_interval = log_interval
+
+        self.checkouts: int = 0
+        self.timeouts: int = 0
+        self.total_wait_time: float = 0.0
+        self.max_wait_time: float = 0.0
+
+        self._last_logged_at: float = time.monotonic()
+        self._lock = Lock()
+
+    def record_checkout(self, pool: QueuePool, wait_time: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self._record_wait_time(wait_time)
+        self._log_if_due(pool)
+
+    def record_timeout(self, pool: QueuePool, wait_time: float) -> None:
+        with self._lock:
+            self.timeouts += 1
+            self._record_wait_time(wait_time)
+        self._log_if_due(pool)
+
+    def get(self, pool: QueuePool) -> dict[str, Any]:
+        """Return counters merged with current state of given pool."""
+        with self._lock:
+            avg_wait_time: float = 0.0
+            if self.checkouts:
+                avg_wait_time = self.total_wait_time / self.checkouts
+
+            return {
+                'size': pool.size(),
+                'checked_out': pool.checkedout(),
+                'overflow': pool.overflow(),
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'avg_wait_time': avg_wait_time,
+                'max_wait_time': self.max_wait_time
+            }
+
+    def _record_wait_time(self, wait_time: float) -> None:
+        self.total_wait_time += wait_time
+        if wait_time > self.max_wait_time:
+            self.max_wait_time = wait_time
+
+    def _log_if_due(self, pool: QueuePool) -> None:
+        if self.log_interval is None:
+            return
+
+        now: float = time.monotonic()
+        with self._lock:
+            if now - self._last_logged_at < self.log_interval:
+                return
+            self._last_logged_at = now
+
+        log.info(f'Db pool stats: {self.get(pool)}')
+
+
+class MeteredQueuePool(QueuePool):
+    """Queue pool recording time spent to obtain connections and checkout
+    timeouts to `stats`.
+
+    Stats object is assigned by Db to a subclass created per Db instance,
+    since engine creates pool by class itself.
+    """
+    stats: PoolStats = PoolStats()
+
+    def connect(self) -> Any:
+        started_at: float = time.perf_counter()
+        try:
+            connection: Any = super().connect()
+        except sa.exc.TimeoutError:
+            self.stats.record_timeout(self, time.perf_counter() - started_at)
+            raise
+        else:
+            self.stats.record_checkout(self, time.perf_counter() - started_at)
+            return connection
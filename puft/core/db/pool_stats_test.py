@@ -0,0 +1,32 @@
+import pytest
+import sqlalchemy as sa
+
+from puft.core.db.pool_stats import PoolStats, MeteredQueuePool
+
+
+class TestPoolStats():
+    def test_checkouts(self, tmp_path):
+        stats = PoolStats()
+        engine = sa.create_engine(
+            f'sqlite:///{tmp_path}/pool.db',
+            poolclass=type(
+                'MeteredQueuePool', (MeteredQueuePool,), {'stats': stats}),
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.1,
+            connect_args={'check_same_thread': False})
+
+        with engine.connect():
+            assert stats.get(engine.pool)['checked_out'] == 1
+
+            with pytest.raises(sa.exc.TimeoutError):
+                engine.connect()
+
+        with engine.connect():
+            pass
+
+        exposed: dict = stats.get(engine.pool)
+        assert exposed['checked_out'] == 0
+        assert exposed['checkouts'] == 2
+        assert exposed['timeouts'] == 1
+        assert exposed['max_wait_time'] >= 0.1
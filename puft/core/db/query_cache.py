@@ -0,0 +1,181 @@
+from __future__ import annotations
+import json
+import math
+import time
+import hashlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from threading import Lock
+from typing import Any
+
+import redis
+
+
+class QueryCacheBackend(ABC):
+    """Storage of query cache entries.
+
+    Should be inherited by custom backends to be set via
+    `Db.set_query_cache()`.
+    """
+    @abstractmethod
+    def get(self, key: str) -> Any:
+        """Return value stored by key or None if there is no such key."""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        """Store JSON-serializable value by key for `ttl` seconds (forever if
+        None)."""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def incr(self, key: str) -> int:
+        """Increment integer stored by key (0 if absent) and return it."""
+        raise NotImplementedError()
+
+
+class MemoryQueryCacheBackend(QueryCacheBackend):
+    """Process-local backend evicting least recently used entries if
+    `max_size` exceeded.
+    """
+    DEFAULT_MAX_SIZE = 1000
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE) -> None:
+        if max_size < 1:
+            raise ValueError(
+                f'Query cache max size should be positive, got {max_size}')
+
+        self.max_size = max_size
+        # Values are tuples (value, expiration time)
+        self._entries: OrderedDict[str, tuple[Any, float | None]] = \
+            OrderedDict()
+        # Counters are held apart to not be evicted
+        self._counters: dict[str, int] = {}
+        self._lock = Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            if key in self._counters:
+                return self._counters[key]
+
+            entry = self._entries.get(key, None)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        expires_at: float | None = None
+        if ttl is not None:
+            expires_at = time.monotonic() + ttl
+
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+
+class RedisQueryCacheBackend(QueryCacheBackend):
+    """Backend shared by all processes connected to the same Redis db."""
+    def __init__(self, url: str) -> None:
+        self.redis = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Any:
+        raw_value: bytes | None = self.redis.get(key)
+        if raw_value is None:
+            return None
+        return json.loads(raw_value)
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        expire: int | None = None
+        if ttl is not None:
+            expire = math.ceil(ttl)
+        self.redis.set(key, json.dumps(value), ex=expire)
+
+    def incr(self, key: str) -> int:
+        return self.redis.incr(key)
+
+
+class QueryCache:
+    """Cache of `Mapper.get_all()` results held as primary key lists.
+
+    Each key contains current version of the model's table, so all entries
+    of the table are invalidated at once by incrementing the version. This
+    also works across processes for shared backends like Redis.
+    """
+    DEFAULT_TTL = 60
+    DEFAULT_PREFIX = 'puft:query_cache'
+
+    def __init__(
+            self,
+            backend: QueryCacheBackend,
+            ttl: float | None = DEFAULT_TTL,
+            prefix: str = DEFAULT_PREFIX) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self.prefix = prefix
+
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def make_key(
+            self,
+            Model: Any,
+            table_name: str,
+            order_by: Any = None,
+            limit: int | None = None,
+            **kwargs) -> str:
+        """Return key of the query with given parameters for current version
+        of the table.
+        """
+        version: int = self.backend.get(self._get_version_key(table_name)) or 0
+        shape: str = repr((
+            Model.__name__,
+            sorted(kwargs.items()),
+            # Columns are represented by their SQL, e.g. `user.id DESC`
+            [str(c) for c in order_by]
+            if type(order_by) is list else str(order_by),
+            limit))
+        digest: str = hashlib.sha1(shape.encode()).hexdigest()
+
+        return f'{self.prefix}:{table_name}:{version}:{digest}'
+
+    def get(self, key: str) -> list[Any] | None:
+        """Return cached primary keys or None."""
+        primary_keys: list[Any] | None = self.backend.get(key)
+
+        if primary_keys is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        return primary_keys
+
+    def set(self, key: str, primary_keys: list[Any]) -> None:
+        self.backend.set(key, primary_keys, ttl=self.ttl)
+
+    def invalidate(self, table_name: str) -> None:
+        """Invalidate all entries of given table."""
+        self.backend.incr(self._get_version_key(table_name))
+
+    def get_stats(self) -> dict[str, int]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+    def _get_version_key(self, table_name: str) -> str:
+        return f'{self.prefix}:{table_name}:version'
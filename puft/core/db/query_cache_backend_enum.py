@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class QueryCacheBackendEnum(Enum):
+    MEMORY = 'memory'
+    REDIS = 'redis'
@@ -0,0 +1,200 @@
+from __future__ import annotations
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+import sqlalchemy as sa
+from flask import g, has_app_context
+
+from puft.tools.log import log
+
+
+class QueryProfile:
+    """Statements executed within one profiled scope, e.g. a request.
+
+    Parameters of statements are redacted to their types, so profiles can
+    be logged without leaking user data.
+    """
+    def __init__(self) -> None:
+        self.query_count: int = 0
+        self.total_time: float = 0.0
+        # Tuples (statement, redacted parameters, duration)
+        self.statements: list[tuple[str, Any, float]] = []
+        self.count_by_statement: dict[str, int] = {}
+
+    def record(self, statement: str, parameters: Any, duration: float) -> None:
+        self.query_count += 1
+        self.total_time += duration
+        self.statements.append(
+            (statement, self.redact(parameters), duration))
+        self.count_by_statement[statement] = \
+            self.count_by_statement.get(statement, 0) + 1
+
+    @classmethod
+    def redact(cls, parameters: Any) -> Any:
+        """Replace parameter values by names of their types."""
+        if isinstance(parameters, dict):
+            return {k: type(v).__name__ for k, v in parameters.items()}
+        elif isinstance(parameters, (list, tuple)):
+            # Executemany parameters are list of tuples or dicts
+            if parameters and isinstance(parameters[0], (list, tuple, dict)):
+                return f'<{len(parameters)} rows>'
+            return tuple(type(v).__name__ for v in parameters)
+        else:
+            return type(parameters).__name__
+
+    def get_slowest(self, count: int = 5) -> list[tuple[str, Any, float]]:
+        """Return given count of the slowest statements, slowest first."""
+        return sorted(
+            self.statements, key=lambda s: s[2], reverse=True)[:count]
+
+    def get_repeated(self, min_count: int = 2) -> dict[str, int]:
+        """Return counts of statements executed at least `min_count` times.
+
+        The same statement executed many times within a request with
+        different parameters is a signature of N+1 queries.
+        """
+        return {
+            statement: count
+            for statement, count in self.count_by_statement.items()
+            if count >= min_count}
+
+    def assert_max_queries(self, count: int) -> None:
+        """Raise AssertionError listing executed statements if there were
+        more than given count of them.
+        """
+        if self.query_count > count:
+            statements: str = '\n'.join(s for s, _, _ in self.statements)
+            raise AssertionError(
+                f'Expected at most {count} queries, executed'
+                f' {self.query_count}:\n{statements}')
+
+
+class QueryProfiler:
+    """Records statements executed by listened engines to the profile of
+    the current app context and to explicitly opened profiles.
+
+    Profile of app context is logged on its teardown if total time of the
+    statements reached `log_threshold` seconds. Statements repeated at least
+    `repeated_threshold` times within the app context are logged as
+    warning.
+    """
+    DEFAULT_LOG_THRESHOLD = 0.5
+    DEFAULT_REPEATED_THRESHOLD = 5
+    DEFAULT_SLOWEST_COUNT = 5
+    # Attribute of Flask's `g` to hold profile of current app context
+    PROFILE_ATTR = 'puft_query_profile'
+    # Key of connection's info dict to hold start times of executed
+    # statements
+    STARTED_AT_KEY = 'puft_query_started_at'
+
+    def __init__(
+            self,
+            log_threshold: float | None = DEFAULT_LOG_THRESHOLD,
+            repeated_threshold: int | None = DEFAULT_REPEATED_THRESHOLD,
+            slowest_count: int = DEFAULT_SLOWEST_COUNT) -> None:
+        self.log_threshold = log_threshold
+        self.repeated_threshold = repeated_threshold
+        self.slowest_count = slowest_count
+
+        self._opened_profiles: ContextVar[tuple[QueryProfile, ...]] = \
+            ContextVar('puft_opened_query_profiles', default=())
+
+    def listen(self, engine: sa.engine.Engine) -> None:
+        if sa.event.contains(
+                engine, 'before_cursor_execute', self._before_cursor_execute):
+            return
+        sa.event.listen(
+            engine, 'before_cursor_execute', self._before_cursor_execute)
+        sa.event.listen(
+            engine, 'after_cursor_execute', self._after_cursor_execute)
+        sa.event.listen(engine, 'handle_error', self._handle_error)
+
+    @contextmanager
+    def profile(self) -> Iterator[QueryProfile]:
+        """Record statements executed within the scope to a new profile."""
+        profile: QueryProfile = QueryProfile()
+        token: Any = self._opened_profiles.set(
+            (*self._opened_profiles.get(), profile))
+        try:
+            yield profile
+        finally:
+            self._opened_profiles.reset(token)
+
+    def get_current_profile(self) -> QueryProfile | None:
+        """Return profile of current app context or None if there is no app
+        context or no statements executed within it.
+        """
+        if not has_app_context():
+            return None
+        return g.get(self.PROFILE_ATTR, None)
+
+    def log_current_profile(self, *args) -> None:
+        """Log profile of current app context if it's due.
+
+        Intended to be called on app context teardown.
+        """
+        profile: QueryProfile | None = self.get_current_profile()
+        if profile is None:
+            return
+
+        if self.repeated_threshold is not None:
+            for statement, count in profile.get_repeated(
+                    self.repeated_threshold).items():
+                log.warning(
+                    f'Statement executed {count} times within one request,'
+                    f' probably N+1 queries: {statement}')
+
+        if self.log_threshold is not None \
+                and profile.total_time >= self.log_threshold:
+            slowest: str = '\n'.join(
+                f'{duration:.4f}s {statement} {parameters}'
+                for statement, parameters, duration
+                in profile.get_slowest(self.slowest_count))
+            log.info(
+                f'Request executed {profile.query_count} queries in'
+                f' {profile.total_time:.4f}s, slowest:\n{slowest}')
+
+    def _before_cursor_execute(
+            self,
+            connection: Any,
+            cursor: Any,
+            statement: str,
+            parameters: Any,
+            context: Any,
+            executemany: bool) -> None:
+        connection.info.setdefault(self.STARTED_AT_KEY, []).append(
+            time.perf_counter())
+
+    def _after_cursor_execute(
+            self,
+            connection: Any,
+            cursor: Any,
+            statement: str,
+            parameters: Any,
+            context: Any,
+            executemany: bool) -> None:
+        duration: float = \
+            time.perf_counter() - connection.info[self.STARTED_AT_KEY].pop()
+
+        profiles: list[QueryProfile] = list(self._opened_profiles.get())
+        if has_app_context():
+            if self.PROFILE_ATTR not in g:
+                setattr(g, self.PROFILE_ATTR, QueryProfile())
+            profiles.append(getattr(g, self.PROFILE_ATTR))
+
+        for profile in profiles:
+            profile.record(statement, parameters, duration)
+
+    def _handle_error(self, exception_context: Any) -> None:
+        """Forget start time of failed statement, since after cursor execute
+        event is not emitted for it and the connection is returned to the
+        pool with the time left otherwise.
+        """
+        connection: Any = exception_context.connection
+        if connection is None:
+            return
+        started_at: list[float] = connection.info.get(self.STARTED_AT_KEY, [])
+        if started_at:
+            started_at.pop()
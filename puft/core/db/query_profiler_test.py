@@ -0,0 +1,50 @@
+import pytest
+import sqlalchemy as sa
+
+from puft.core.db.query_profiler import QueryProfile, QueryProfiler
+
+
+class TestQueryProfiler():
+    def test_profile(self):
+        profiler = QueryProfiler()
+        engine = sa.create_engine('sqlite://')
+        profiler.listen(engine)
+        profiler.listen(engine)
+
+        with profiler.profile() as profile:
+            with engine.connect() as connection:
+                for i in range(3):
+                    connection.execute(
+                        sa.text('SELECT :value'), {'value': f'secret{i}'})
+                connection.execute(sa.text('SELECT 1'))
+
+        assert profile.query_count == 4
+        assert profile.total_time > 0
+        assert profile.get_repeated(3) == {'SELECT ?': 3}
+        assert len(profile.get_slowest(2)) == 2
+        assert all(
+            'secret' not in str(parameters)
+            for _, parameters, _ in profile.statements)
+
+        profile.assert_max_queries(4)
+        with pytest.raises(AssertionError):
+            profile.assert_max_queries(3)
+
+    def test_failed_statement(self):
+        profiler = QueryProfiler()
+        engine = sa.create_engine('sqlite://')
+        profiler.listen(engine)
+
+        with profiler.profile() as profile:
+            with engine.connect() as connection:
+                with pytest.raises(sa.exc.OperationalError):
+                    connection.execute(sa.text('SELECT * FROM missing'))
+                assert connection.info[QueryProfiler.STARTED_AT_KEY] == []
+                connection.execute(sa.text('SELECT 1'))
+
+        assert profile.query_count == 1
+
+    def test_redact(self):
+        assert QueryProfile.redact(('name', 1)) == ('str', 'int')
+        assert QueryProfile.redact({'name': 'x'}) == {'name': 'str'}
+        assert QueryProfile.redact([('a',), ('b',)]) == '<2 rows>'
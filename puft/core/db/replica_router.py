@@ -0,0 +1,57 @@
+from __future__ import annotations
+from itertools import count
+from threading import Lock
+from typing import Any
+
+import sqlalchemy as sa
+
+from .replica_strategy_enum import ReplicaStrategyEnum
+
+
+class ReplicaRouter:
+    """Picks read replica engine to execute read queries with.
+
+    Replica with least in-flight queries is measured by count of connections
+    checked out from its pool.
+    """
+    def __init__(
+            self,
+            engines: list[sa.engine.Engine],
+            strategy_enum: ReplicaStrategyEnum =
+                ReplicaStrategyEnum.ROUND_ROBIN) -> None:
+        if not engines:
+            raise ValueError('At least one replica engine should be given')
+
+        self.engines = engines
+        self.strategy_enum = strategy_enum
+
+        self._counter = count()
+        self._in_flight: list[int] = [0] * len(engines)
+        self._lock = Lock()
+
+        for ix, engine in enumerate(engines):
+            sa.event.listen(engine, 'checkout', self._make_listener(ix, 1))
+            sa.event.listen(engine, 'checkin', self._make_listener(ix, -1))
+
+    def pick(self) -> sa.engine.Engine:
+        match self.strategy_enum:
+            case ReplicaStrategyEnum.ROUND_ROBIN:
+                with self._lock:
+                    ix = next(self._counter) % len(self.engines)
+            case ReplicaStrategyEnum.LEAST_IN_FLIGHT:
+                with self._lock:
+                    ix = self._in_flight.index(min(self._in_flight))
+            case _:
+                raise NotImplementedError()
+        return self.engines[ix]
+
+    def get_in_flight(self) -> list[int]:
+        """Return count of in-flight queries per replica."""
+        with self._lock:
+            return list(self._in_flight)
+
+    def _make_listener(self, ix: int, delta: int) -> Any:
+        def listener(*args) -> None:
+            with self._lock:
+                self._in_flight[ix] += delta
+        return listener
@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class ReplicaStrategyEnum(Enum):
+    ROUND_ROBIN = 'round_robin'
+    LEAST_IN_FLIGHT = 'least_in_flight'
@@ -0,0 +1,214 @@
+from __future__ import annotations
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+import sqlalchemy as sa
+from sqlalchemy import orm
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+
+from .replica_router import ReplicaRouter
+
+
+class RoutingSession(SignallingSession):
+    """Session executing read queries marked by `REPLICA_OPTION` on read
+    replicas.
+
+    All other statements, as well as everything after the session's first
+    write, are executed on the primary, so a request reads own writes.
+
+    If shards are configured, statements of sharded models are executed on
+    the shard given by `SHARD_OPTION` or on all shards with merged results.
+    Instances are written to the shard chosen by their shard key, loaded
+    instances remember their shard as identity token.
+    """
+    # Execution option to mark query as allowed to be read from replica
+    REPLICA_OPTION = 'puft_replica'
+    # Execution option to execute statement of sharded model on given shard
+    SHARD_OPTION = 'puft_shard'
+    # Key of session's info dict to mark that session has written
+    WRITTEN_KEY = 'puft_written'
+
+    def __init__(
+            self,
+            db: RoutingSQLAlchemy,
+            *args,
+            shard_binds: dict[str, Any] | None = None,
+            **kwargs) -> None:
+        self._routing_db = db
+        self._is_sharding_enabled: bool = True
+        # Engines or connections to use instead of shard engines, e.g. to
+        # join external transactions in tests
+        self._shard_binds: dict[str, Any] = shard_binds or {}
+        super().__init__(db, *args, **kwargs)
+
+    @property
+    def connection_callable(self) -> Any:  # type: ignore
+        """Return callable giving connection for each written instance, so
+        sharded instances are flushed to their shards.
+
+        None is returned if sharding is not configured, since bulk
+        operations are not supported with per instance connections.
+        """
+        if not self._routing_db.shard_names or not self._is_sharding_enabled:
+            return None
+        return self._get_connection_for_instance
+
+    @contextmanager
+    def without_sharding(self) -> Iterator[None]:
+        """Write all instances within the scope by default binds, e.g. for
+        bulk operations on not sharded models.
+        """
+        self._is_sharding_enabled = False
+        try:
+            yield
+        finally:
+            self._is_sharding_enabled = True
+
+    def get_shard(self, instance: Any) -> str | None:
+        """Return shard of given instance or None if it's not sharded.
+
+        Shard of new instance is chosen by its model's `choose_shard()`
+        from its shard key value.
+        """
+        state: Any = sa.inspect(instance)
+        if not self._routing_db.is_sharded(state.mapper):
+            return None
+        if state.key is not None:
+            return state.key[2]
+        if state.identity_token is not None:
+            return state.identity_token
+
+        Model: Any = state.mapper.class_
+        shard_key_value: Any = getattr(instance, Model.__shard_key__)
+        if shard_key_value is None:
+            raise ValueError(
+                f'Shard key {Model.__shard_key__} of {Model.__name__} is not'
+                ' set')
+        shard: str = Model.choose_shard(shard_key_value)
+        state.identity_token = shard
+        return shard
+
+    def _get_connection_for_instance(
+            self, mapper: Any = None, instance: Any = None, **kwargs) -> Any:
+        bind_arguments: dict[str, Any] = {'mapper': mapper}
+        if instance is not None:
+            bind_arguments['shard'] = self.get_shard(instance)
+        return self.connection(bind_arguments=bind_arguments)
+
+    def get_bind(
+            self, mapper=None, clause=None, shard=None, **kwargs) -> Any:
+        if shard is not None:
+            if shard in self._shard_binds:
+                return self._shard_binds[shard]
+            return self._routing_db.get_engine(self.app, bind=shard)
+
+        router: ReplicaRouter | None = self._routing_db.replica_router
+        if (
+                router is not None
+                and clause is not None
+                and not self._flushing
+                and not self.info.get(self.WRITTEN_KEY, False)
+                and clause.get_execution_options().get(
+                    self.REPLICA_OPTION, False)):
+            return router.pick()
+        return super().get_bind(mapper=mapper, clause=clause)
+
+    def stick_to_primary(self) -> None:
+        """Execute all further statements of the session on the primary."""
+        self.info[self.WRITTEN_KEY] = True
+
+
+@sa.event.listens_for(RoutingSession, 'after_flush')
+def _stick_to_primary_on_flush(session: RoutingSession, *args) -> None:
+    session.stick_to_primary()
+
+
+@sa.event.listens_for(RoutingSession, 'after_bulk_update')
+@sa.event.listens_for(RoutingSession, 'after_bulk_delete')
+def _stick_to_primary_on_bulk(context: Any) -> None:
+    context.session.stick_to_primary()
+
+
+@sa.event.listens_for(RoutingSession, 'do_orm_execute', retval=True)
+def _execute_on_shards(orm_execute_state: Any) -> Any:
+    """Execute statement of sharded model on its shard or on all shards
+    merging their results.
+    """
+    session: RoutingSession = orm_execute_state.session
+    mapper: Any = orm_execute_state.bind_mapper
+    if mapper is None or not session._routing_db.is_sharded(mapper):
+        return None
+
+    active_options: Any = None
+    if orm_execute_state.is_select:
+        active_options = orm_execute_state.load_options
+    elif orm_execute_state.is_update or orm_execute_state.is_delete:
+        active_options = orm_execute_state.update_delete_options
+
+    shards: list[str]
+    lazy_loaded_from: Any = None
+    if orm_execute_state.is_select:
+        lazy_loaded_from = orm_execute_state.lazy_loaded_from
+    if active_options is not None \
+            and active_options._refresh_identity_token is not None:
+        # Refresh of loaded instance
+        shards = [active_options._refresh_identity_token]
+    elif RoutingSession.SHARD_OPTION in orm_execute_state.execution_options:
+        shards = [
+            orm_execute_state.execution_options[RoutingSession.SHARD_OPTION]]
+    elif 'shard' in orm_execute_state.bind_arguments:
+        shards = [orm_execute_state.bind_arguments['shard']]
+    elif lazy_loaded_from is not None \
+            and lazy_loaded_from.identity_token is not None:
+        shards = [lazy_loaded_from.identity_token]
+    else:
+        shards = session._routing_db.shard_names
+
+    results: list[Any] = [
+        _execute_on_shard(orm_execute_state, shard, active_options)
+        for shard in shards]
+    return results[0].merge(*results[1:])
+
+
+def _execute_on_shard(
+        orm_execute_state: Any, shard: str, active_options: Any) -> Any:
+    execution_options: dict[str, Any] = dict(
+        orm_execute_state.local_execution_options)
+    # Loaded instances get shard as identity token, so the same primary
+    # keys of different shards are not mixed in identity map
+    if orm_execute_state.is_select:
+        execution_options['_sa_orm_load_options'] = \
+            active_options + {'_refresh_identity_token': shard}
+    elif orm_execute_state.is_update or orm_execute_state.is_delete:
+        execution_options['_sa_orm_update_options'] = \
+            active_options + {'_refresh_identity_token': shard}
+
+    return orm_execute_state.invoke_statement(
+        bind_arguments={**orm_execute_state.bind_arguments, 'shard': shard},
+        execution_options=execution_options)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """Native db creating sessions with read replica and shard routing.
+
+    Replica router and shard names are assigned by Db on setup if replicas
+    or shards are configured. Shards are binds of Flask-SQLAlchemy, all
+    tables of sharded models are created on each of them.
+    """
+    # Bind key of tables of sharded models
+    SHARDS_BIND_KEY = 'puft_shards'
+
+    replica_router: ReplicaRouter | None = None
+    shard_names: list[str] = []
+
+    def create_session(self, options: dict) -> Any:
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def is_sharded(self, mapper: Any) -> bool:
+        return mapper.base_mapper.local_table.info.get(
+            'bind_key', None) == self.SHARDS_BIND_KEY
+
+    def get_tables_for_bind(self, bind: str | None = None) -> list[Any]:
+        if bind in self.shard_names:
+            bind = self.SHARDS_BIND_KEY
+        return super().get_tables_for_bind(bind)
@@ -0,0 +1,61 @@
+import sqlalchemy as sa
+from flask import Flask
+
+from puft.core.db.replica_router import ReplicaRouter
+from puft.core.db.replica_strategy_enum import ReplicaStrategyEnum
+from puft.core.db.routing_session import RoutingSession, RoutingSQLAlchemy
+
+
+class TestRoutingSession():
+    def test_read_from_replica(self, tmp_path):
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = \
+            f'sqlite:///{tmp_path}/primary.db'
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        native_db = RoutingSQLAlchemy()
+
+        class Item(native_db.Model):
+            id = sa.Column(sa.Integer, primary_key=True)
+            name = sa.Column(sa.String(50))
+
+        native_db.init_app(app)
+        replica = sa.create_engine(f'sqlite:///{tmp_path}/replica.db')
+        native_db.Model.metadata.create_all(replica)
+        with replica.begin() as connection:
+            connection.execute(
+                Item.__table__.insert().values(name='replica'))
+        native_db.replica_router = ReplicaRouter([replica])
+
+        def read_query():
+            return Item.query.execution_options(
+                **{RoutingSession.REPLICA_OPTION: True})
+
+        with app.app_context():
+            native_db.create_all()
+            assert read_query().first().name == 'replica'
+            # Not marked queries are executed on primary
+            assert Item.query.first() is None
+
+            native_db.session.add(Item(name='primary'))
+            native_db.session.commit()
+
+            assert read_query().first().name == 'primary'
+
+        with app.app_context():
+            assert read_query().first().name == 'replica'
+
+
+class TestReplicaRouter():
+    def test_strategies(self):
+        engines = [sa.create_engine('sqlite://') for _ in range(2)]
+
+        router = ReplicaRouter(engines)
+        assert [router.pick() for _ in range(3)] == \
+            [engines[0], engines[1], engines[0]]
+
+        router = ReplicaRouter(
+            engines, strategy_enum=ReplicaStrategyEnum.LEAST_IN_FLIGHT)
+        with engines[0].connect():
+            assert router.get_in_flight() == [1, 0]
+            assert router.pick() is engines[1]
+        assert router.get_in_flight() == [0, 0]
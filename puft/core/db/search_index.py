@@ -0,0 +1,282 @@
+from __future__ import annotations
+import re
+from typing import Any
+
+import sqlalchemy as sa
+from alembic.autogenerate import comparators, renderers
+from alembic.operations.ops import MigrateOperation
+
+
+class SearchIndex:
+    """Full-text search index over text columns of a table.
+
+    On SQLite the index is FTS5 table `<table>_search` with external content
+    (i.e. holding only the index itself) kept in sync by triggers. On
+    PostgreSQL it's GIN index of the columns' tsvector expression, which is
+    maintained by PostgreSQL itself. In both cases the index is updated by
+    any write to the table, including bulk and set-based ones.
+
+    Index structures are created and dropped together with the table by
+    `create_all()` and `drop_all()`. Autogenerated migrations execute
+    statements of `get_create_statements()` for indexes missing in the
+    database, while index structures themselves are excluded from the
+    schema comparison by `include_search_object()`.
+
+    Search query is a plain text: rows containing all its words are matched.
+    """
+    DEFAULT_LANGUAGE = 'english'
+    SUPPORTED_DIALECT_NAMES = ['sqlite', 'postgresql']
+    # Key of the table's info referring to its index
+    INFO_KEY = 'search_index'
+    # Suffixes of FTS5 shadow tables
+    SHADOW_SUFFIXES = ['data', 'idx', 'docsize', 'config', 'content']
+
+    def __init__(
+            self,
+            table: sa.Table,
+            columns: list[sa.Column],
+            primary_key: sa.Column,
+            language: str = DEFAULT_LANGUAGE) -> None:
+        # Language is a part of the index expression, so it's not bound
+        if not re.fullmatch(r'[a-z_]+', language):
+            raise ValueError(
+                f'Search language {language!r} of table {table.name} should'
+                ' contain only lowercase letters and underscores')
+
+        self.table = table
+        self.columns = columns
+        self.primary_key = primary_key
+        self.language = language
+        self.name: str = f'{table.name}_search'
+
+        # FTS5 table has hidden column named after the table used as match
+        # target and hidden rank column
+        self.fts_table: sa.Table = sa.Table(
+            self.name, sa.MetaData(),
+            sa.Column('rowid', sa.Integer, primary_key=True),
+            sa.Column(self.name, sa.Text),
+            sa.Column('rank', sa.Float),
+            *[sa.Column(c.name, sa.Text) for c in columns])
+        table.info[self.INFO_KEY] = self
+
+    def listen(self) -> None:
+        """Create and drop index structures together with the table."""
+        sa.event.listen(self.table, 'after_create', self._create)
+        sa.event.listen(self.table, 'before_drop', self._drop)
+
+    def _create(self, table: sa.Table, connection: Any, **kwargs) -> None:
+        for statement in self.get_create_statements(connection.dialect.name):
+            connection.exec_driver_sql(statement)
+
+    def _drop(self, table: sa.Table, connection: Any, **kwargs) -> None:
+        for statement in self.get_drop_statements(connection.dialect.name):
+            connection.exec_driver_sql(statement)
+
+    def exists(self, connection: Any) -> bool:
+        """Check if the index is created in the database."""
+        if connection.dialect.name == 'postgresql':
+            return connection.execute(
+                sa.text('SELECT 1 FROM pg_indexes WHERE indexname = :name'),
+                {'name': self.name}).first() is not None
+        self._check_sqlite(connection.dialect.name)
+        return sa.inspect(connection).has_table(self.name)
+
+    def get_create_statements(self, dialect_name: str) -> list[str]:
+        """Return DDL statements creating the index for given dialect.
+
+        Raise:
+            NotImplementedError:
+                Dialect is not supported.
+        """
+        table: str = self._quote(self.table.name)
+        index: str = self._quote(self.name)
+        if dialect_name == 'postgresql':
+            return [
+                f'CREATE INDEX IF NOT EXISTS {index} ON {table}'
+                f' USING GIN ({self._get_tsvector_sql(is_qualified=False)})']
+        self._check_sqlite(dialect_name)
+
+        columns: list[str] = [self._quote(c.name) for c in self.columns]
+        primary_key: str = self._quote(self.primary_key.name)
+        new_values: str = ', '.join(
+            [f'new.{primary_key}', *(f'new.{c}' for c in columns)])
+        old_values: str = ', '.join(
+            [f'old.{primary_key}', *(f'old.{c}' for c in columns)])
+        insert: str = \
+            f'INSERT INTO {index}(rowid, {", ".join(columns)})' \
+            f' VALUES ({new_values});'
+        delete: str = \
+            f'INSERT INTO {index}({index}, rowid, {", ".join(columns)})' \
+            f" VALUES ('delete', {old_values});"
+
+        return [
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5('
+            f'{", ".join(columns)}, content={table},'
+            f' content_rowid={primary_key})',
+            f'CREATE TRIGGER IF NOT EXISTS {self._quote(self.name + "_ai")}'
+            f' AFTER INSERT ON {table} BEGIN {insert} END',
+            f'CREATE TRIGGER IF NOT EXISTS {self._quote(self.name + "_ad")}'
+            f' AFTER DELETE ON {table} BEGIN {delete} END',
+            f'CREATE TRIGGER IF NOT EXISTS {self._quote(self.name + "_au")}'
+            f' AFTER UPDATE ON {table} BEGIN {delete} {insert} END',
+            # Index rows written before the index creation
+            f"INSERT INTO {index}({index}) VALUES ('rebuild')"]
+
+    def get_drop_statements(self, dialect_name: str) -> list[str]:
+        """Return DDL statements dropping the index for given dialect.
+
+        Triggers of SQLite are dropped as well, since the index may be
+        dropped by migration without the table.
+        """
+        if dialect_name == 'postgresql':
+            return [f'DROP INDEX IF EXISTS {self._quote(self.name)}']
+        self._check_sqlite(dialect_name)
+        return [
+            *(
+                f'DROP TRIGGER IF EXISTS {self._quote(self.name + suffix)}'
+                for suffix in ['_ai', '_ad', '_au']),
+            f'DROP TABLE IF EXISTS {self._quote(self.name)}']
+
+    def apply(
+            self,
+            query: Any,
+            search_query: str,
+            dialect_name: str,
+            rank: bool = True) -> Any:
+        """Return ORM query filtered by rows matching search query and
+        ordered by their relevance if `rank` is set.
+        """
+        if dialect_name == 'postgresql':
+            tsquery: Any = sa.func.plainto_tsquery(
+                self.language, search_query)
+            tsvector: Any = sa.literal_column(
+                self._get_tsvector_sql(is_qualified=True))
+            query = query.filter(tsvector.op('@@')(tsquery))
+            if rank:
+                query = query.order_by(sa.func.ts_rank(tsvector, tsquery).desc())
+            return query
+        self._check_sqlite(dialect_name)
+
+        query = query \
+            .join(self.fts_table, self.fts_table.c.rowid == self.primary_key) \
+            .filter(self.fts_table.c[self.name].op('MATCH')(
+                self._make_fts_query(search_query)))
+        if rank:
+            # Rank is BM25 score, which is lower for better matches
+            query = query.order_by(self.fts_table.c.rank)
+        return query
+
+    @staticmethod
+    def _make_fts_query(search_query: str) -> str:
+        """Return FTS5 query matching all words of given text.
+
+        Words are quoted as strings to not be interpreted as FTS5 operators.
+        """
+        return ' '.join(
+            '"' + word.replace('"', '""') + '"'
+            for word in search_query.split())
+
+    def _get_tsvector_sql(self, is_qualified: bool) -> str:
+        """Return tsvector expression of the columns.
+
+        Expression used by queries should be the same as indexed one to use
+        the index, qualifying of columns doesn't matter.
+        """
+        prefix: str = ''
+        if is_qualified:
+            prefix = self._quote(self.table.name) + '.'
+        document: str = " || ' ' || ".join(
+            f"coalesce({prefix}{self._quote(c.name)}, '')"
+            for c in self.columns)
+        return f"to_tsvector('{self.language}', {document})"
+
+    @staticmethod
+    def _quote(name: str) -> str:
+        return '"' + name.replace('"', '""') + '"'
+
+    @staticmethod
+    def _check_sqlite(dialect_name: str) -> None:
+        if dialect_name != 'sqlite':
+            raise NotImplementedError(
+                f'Full-text search is not supported by {dialect_name}')
+
+
+def include_search_object(
+        object: Any,
+        name: str | None,
+        type_: str,
+        reflected: bool,
+        compare_to: Any) -> bool:
+    """Exclude structures of search indexes from Alembic's autogenerate.
+
+    FTS5 table, its shadow tables and GIN index are not declared by
+    models, so without exclusion autogenerate drops them. They are created
+    by `CreateSearchIndexOp` instead.
+
+    Should be passed as `include_object` to Alembic's context.
+    """
+    if not reflected or compare_to is not None or name is None:
+        return True
+    return re.fullmatch(
+        r'.+_search(_({}))?'.format('|'.join(SearchIndex.SHADOW_SUFFIXES)),
+        name) is None
+
+
+class CreateSearchIndexOp(MigrateOperation):
+    """Migration operation creating search index of a table."""
+    def __init__(self, search_index: SearchIndex, dialect_name: str) -> None:
+        self.search_index = search_index
+        self.dialect_name = dialect_name
+
+    def reverse(self) -> DropSearchIndexOp:
+        return DropSearchIndexOp(self.search_index, self.dialect_name)
+
+
+class DropSearchIndexOp(MigrateOperation):
+    """Migration operation dropping search index of a table."""
+    def __init__(self, search_index: SearchIndex, dialect_name: str) -> None:
+        self.search_index = search_index
+        self.dialect_name = dialect_name
+
+    def reverse(self) -> CreateSearchIndexOp:
+        return CreateSearchIndexOp(self.search_index, self.dialect_name)
+
+
+@comparators.dispatch_for('schema')
+def _compare_search_indexes(
+        autogen_context: Any, upgrade_ops: Any, schemas: Any) -> None:
+    """Add creation of search indexes missing in the database to
+    autogenerated migration.
+
+    Operations are appended after the ones of tables, so tables of new
+    models are created before their indexes.
+    """
+    dialect_name: str = autogen_context.dialect.name
+    if dialect_name not in SearchIndex.SUPPORTED_DIALECT_NAMES:
+        return
+
+    for table in autogen_context.sorted_tables:
+        search_index: SearchIndex | None = table.info.get(
+            SearchIndex.INFO_KEY, None)
+        if search_index is not None \
+                and not search_index.exists(autogen_context.connection):
+            upgrade_ops.ops.append(
+                CreateSearchIndexOp(search_index, dialect_name))
+
+
+@renderers.dispatch_for(CreateSearchIndexOp)
+def _render_create_search_index(
+        autogen_context: Any, op: CreateSearchIndexOp) -> list[str]:
+    return [
+        f'op.execute({statement!r})'
+        for statement
+        in op.search_index.get_create_statements(op.dialect_name)]
+
+
+@renderers.dispatch_for(DropSearchIndexOp)
+def _render_drop_search_index(
+        autogen_context: Any, op: DropSearchIndexOp) -> list[str]:
+    return [
+        f'op.execute({statement!r})'
+        for statement
+        in op.search_index.get_drop_statements(op.dialect_name)]
@@ -0,0 +1,94 @@
+"""PRAGMA settings applied to each new SQLite connection.
+
+Settings are described in `sqlite` section of db config, either by profile
+or key by key (explicit keys override profile ones), e.g.:
+```yaml
+sqlite:
+  profile: fast
+  busy_timeout: 10000
+```
+
+Refs:
+    https://www.sqlite.org/pragma.html
+"""
+from typing import Any
+
+from .sqlite_profile_enum import SqliteProfileEnum
+
+
+PRAGMAS_BY_PROFILE: dict[SqliteProfileEnum, dict[str, Any]] = {
+    # Durable on power loss, WAL lets readers work in parallel with writer
+    SqliteProfileEnum.SAFE: {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'busy_timeout': 5000
+    },
+    # WAL with NORMAL synchronous may lose last commits on power loss, but
+    # never corrupts db
+    SqliteProfileEnum.FAST: {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        # Negative value is size in KiB, i.e. 64 MiB
+        'cache_size': -64000,
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000
+    }
+}
+
+# Allowed values of enumerated pragmas, int pragmas are mapped to None
+_CHOICES_BY_PRAGMA: dict[str, set[str] | None] = {
+    'journal_mode': {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'},
+    'synchronous': {'OFF', 'NORMAL', 'FULL', 'EXTRA'},
+    'temp_store': {'DEFAULT', 'FILE', 'MEMORY'},
+    'cache_size': None,
+    'mmap_size': None,
+    'busy_timeout': None
+}
+
+
+def parse_sqlite_pragmas(config: dict[str, Any]) -> dict[str, Any]:
+    """Return validated pragmas described by given `sqlite` config section.
+
+    Raise:
+        ValueError:
+            Unrecognized profile, pragma or pragma value
+    """
+    pragmas: dict[str, Any] = {}
+
+    for key, value in config.items():
+        if key == 'profile':
+            pragmas = {
+                **PRAGMAS_BY_PROFILE[SqliteProfileEnum(value)], **pragmas}
+            continue
+
+        try:
+            choices: set[str] | None = _CHOICES_BY_PRAGMA[key]
+        except KeyError:
+            raise ValueError(f'Unrecognized SQLite pragma: {key}')
+
+        # Values are formatted to SQL directly, since pragmas don't support
+        # bound parameters, so they should be strictly validated
+        if choices is None:
+            if type(value) is not int:
+                raise ValueError(
+                    f'SQLite pragma {key} should be int, got {value}')
+        else:
+            value = str(value).upper()
+            if value not in choices:
+                raise ValueError(
+                    f'SQLite pragma {key} should be one of {choices},'
+                    f' got {value}')
+
+        pragmas[key] = value
+
+    return pragmas
+
+
+def apply_sqlite_pragmas(dbapi_connection: Any, pragmas: dict[str, Any]) -> None:
+    cursor: Any = dbapi_connection.cursor()
+    try:
+        for key, value in pragmas.items():
+            cursor.execute(f'PRAGMA {key} = {value}')
+    finally:
+        cursor.close()
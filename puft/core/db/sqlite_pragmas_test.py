@@ -0,0 +1,20 @@
+import pytest
+
+from puft.core.db.sqlite_pragmas import parse_sqlite_pragmas
+
+
+class TestSqlitePragmas():
+    def test_profile_override(self):
+        pragmas: dict = parse_sqlite_pragmas(
+            {'synchronous': 'full', 'profile': 'fast'})
+
+        assert pragmas['journal_mode'] == 'WAL'
+        assert pragmas['synchronous'] == 'FULL'
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            parse_sqlite_pragmas({'synchronous': 'NORMAL; DROP TABLE user'})
+        with pytest.raises(ValueError):
+            parse_sqlite_pragmas({'cache_size': '1000'})
+        with pytest.raises(ValueError):
+            parse_sqlite_pragmas({'foreign_keys': 1})
@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class SqliteProfileEnum(Enum):
+    SAFE = 'safe'
+    FAST = 'fast'
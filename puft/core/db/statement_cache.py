@@ -0,0 +1,72 @@
+from __future__ import annotations
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable
+
+
+class StatementCache:
+    """Cache of read statements built by Mapper keyed by their shape, i.e.
+    model, filtered attributes, order, limit and loaded relationships.
+
+    Filter values are bound parameters of cached statements, so the same
+    statement object is executed for all calls of the same shape. This skips
+    building of the statement on each call and lets SQLAlchemy reuse its
+    compiled form.
+
+    Evicts least recently used statements if `max_size` exceeded.
+    """
+    DEFAULT_MAX_SIZE = 500
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE) -> None:
+        if max_size < 1:
+            raise ValueError(
+                f'Statement cache max size should be positive, got {max_size}')
+
+        self.max_size = max_size
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+        self._statements: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._statements)
+
+    def get(self, key: Hashable) -> Any:
+        """Return statement cached by key or None."""
+        with self._lock:
+            statement: Any = self._statements.get(key, None)
+            if statement is None:
+                self.misses += 1
+                return None
+
+            self._statements.move_to_end(key)
+            self.hits += 1
+            return statement
+
+    def set(self, key: Hashable, statement: Any) -> None:
+        with self._lock:
+            self._statements[key] = statement
+            self._statements.move_to_end(key)
+
+            while len(self._statements) > self.max_size:
+                self._statements.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._statements.clear()
+
+    def get_stats(self) -> dict[str, Any]:
+        """Return counters of the cache."""
+        with self._lock:
+            requests: int = self.hits + self.misses
+            return {
+                'size': len(self._statements),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / requests if requests else 0.0
+            }
@@ -0,0 +1,26 @@
+import pytest
+
+from puft.core.db.statement_cache import StatementCache
+
+
+class TestStatementCache():
+    def test_eviction(self):
+        cache = StatementCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        assert cache.get('a') == 1
+        cache.set('c', 3)
+
+        assert cache.get('b') is None
+        assert cache.get('c') == 3
+        assert cache.get_stats() == {
+            'size': 2,
+            'hits': 2,
+            'misses': 1,
+            'evictions': 1,
+            'hit_rate': 2 / 3
+        }
+
+    def test_max_size(self):
+        with pytest.raises(ValueError):
+            StatementCache(max_size=0)
@@ -6,6 +6,8 @@ from typing import ClassVar
 from warepy import snakefy
 from schema import Schema, Or, Optional
 
+from puft.core.db.model_loader import Deferred
+
 
 @dataclass
 class Ie:
@@ -55,6 +57,14 @@ class Ie:
 
         # Decompose all keys in self dict
         for k, v in self.__dict__.items():
+            if isinstance(v, Deferred):
+                # Resolve values loaded in batch, e.g. cells of
+                # `Cell.load()`, which are decomposed as folded Ies
+                v = v.get()
+                if isinstance(v, Ie):
+                    res_dict[k] = v.get_inner_json()
+                    continue
+
             if type(v) is Ie:
                 # For folded Ies make their own json decompositions
                 res_dict[k] = v.get_inner_json()
@@ -1,7 +1,8 @@
 from ctypes import c_size_t
 from dataclasses import dataclass
-from typing import ClassVar
+from typing import Any, ClassVar
 from pytest import fixture
+from puft.core.db.model_loader import Deferred
 from puft.core.ie.ie import Ie
 from puft.core.test.mock import Mock
 
@@ -55,3 +56,27 @@ class TestIe():
 
         json_custom_name: dict = custom_ie.get_json('testname')
         assert 'testname' in json_custom_name
+
+    def test_deferred(self, custom_ie: CustomIe):
+        @dataclass
+        class HolderIe(Ie):
+            custom: Any
+            nested: Any
+            count: Any
+
+        holder: HolderIe = HolderIe(
+            custom=Deferred(lambda: custom_ie),
+            nested=custom_ie,
+            count=Deferred(lambda: 1))
+
+        # Deferred Ies are decomposed, while nested Ie subclasses are kept
+        # as they are
+        assert holder.get_inner_json() == {
+            'custom': {
+                'name': custom_ie.name,
+                'age': custom_ie.age,
+                'tags': custom_ie.tags
+            },
+            'nested': custom_ie,
+            'count': 1
+        }
@@ -6,6 +6,7 @@ from puft.core.parsing.parsing_error import (
     IntParsingError, KeyParsingError, ParsingError)
 from puft.tools.query_parameter_error import QueryParameterError
 from puft.core.db.db import orm
+from puft.core.db.load_strategy_enum import LoadStrategyEnum
 
 from puft.tools.filter_query_enum import FilterQueryEnum
 from puft.core.validation import validate
@@ -83,8 +84,21 @@ OrmModel = TypeVar('OrmModel', bound=orm.Model)
 def parse_models(
             Model: OrmModel,
             filter_query: str | None = 'all',
-            **kwargs) -> list[OrmModel]:
-    """Analyze given parameters and return orm models."""
+            cache: bool = False,
+            load: list[str] | None = None,
+            load_strategy: str | None = None,
+            **kwargs) -> list[OrmModel] | int:
+    """Analyze given parameters and return orm models.
+
+    For `count` filter query count of matched models is returned instead,
+    computed without their loading. Ordering and limit are ignored then.
+
+    Results of `all` filter query are read through query cache if `cache` is
+    true, see `Mapper.get_all()`.
+
+    Relationship paths given in `load` are loaded eagerly by `load_strategy`
+    (`selectin` by default), see `Mapper.get_all()`.
+    """
     if filter_query is None:
         filter_query = 'all'
     if type(filter_query) is not str:
@@ -102,15 +116,36 @@ def parse_models(
     match filter_query_enum:
         case FilterQueryEnum.ALL:
             method = Model.get_all  # type: ignore
+            method_kwargs['cache'] = cache
         case FilterQueryEnum.FIRST:
             method = Model.get_first  # type: ignore
+        case FilterQueryEnum.COUNT:
+            method = Model.count  # type: ignore
+            kwargs.pop('order_by', None)
+            kwargs.pop('limit', None)
+            if load:
+                raise QueryParameterError(
+                    'Relationships cannot be loaded for count filter query')
+            load_strategy = None
         case _:
             raise NotImplementedError()
 
+    if load:
+        method_kwargs['load'] = load
+    if load_strategy is not None:
+        try:
+            method_kwargs['load_strategy'] = LoadStrategyEnum(load_strategy)
+        except ValueError:
+            raise QueryParameterError(
+                f'Load strategy cannot be {load_strategy}')
+
     for k, v in kwargs.items():
         if v is not None:
             method_kwargs[k] = v
 
+    if filter_query_enum is FilterQueryEnum.COUNT:
+        return method(**method_kwargs)
+
     models: list[orm.Model] = method(**method_kwargs)
 
     if filter_query_enum is FilterQueryEnum.FIRST:
@@ -6,6 +6,7 @@ from werkzeug.test import TestResponse
 from puft.core.app.puft import Puft
 from puft.core import validation, parsing
 from puft.core.db.db import Db
+from puft.core.db.db_isolation_enum import DbIsolationEnum
 from puft.core.sock.socket import Socket
 from puft.tools.get_root_dir import get_root_dir
 
@@ -38,18 +39,16 @@ class Test:
         app: Puft = Puft.instance()
         yield app
 
+    # Isolation of db changes made by each test, defaults to
+    # `test_isolation` from db config
+    db_isolation: DbIsolationEnum | None = None
+
     @fixture
     def db(self, app: Puft):
         db: Db = Db.instance()
 
-        with app.app_context():
-            db.drop_all()
-            db.create_all()
-
-        yield db
-
-        with app.app_context():
-            db.drop_all()
+        with db.isolate_test(app.get_native_app(), self.db_isolation):
+            yield db
 
     @fixture
     def socket(self) -> Socket:
@@ -0,0 +1,103 @@
+"""Conditional requests by ETags derived from versions of models.
+
+View sets models the response depends on by `View.set_etag()`, views
+registered by `Puft.register_view()` are wrapped by `make_conditional()`
+to answer with 304 or add ETag header to the response.
+"""
+from __future__ import annotations
+import hashlib
+from functools import wraps
+from typing import Any, Callable
+
+import sqlalchemy as sa
+from flask import Flask, g, request
+
+from .precondition_failed_error import PreconditionFailedError
+
+# Attribute of Flask's `g` to hold models of response's ETag
+ETAG_MODELS_ATTR = 'puft_etag_models'
+
+
+class NotModified(Exception):
+    """Stops view before building of the response body, since client holds
+    its actual version.
+    """
+    def __init__(self, etag: str) -> None:
+        super().__init__(etag)
+        self.etag = etag
+
+
+def make_etag(*models: Any) -> str:
+    """Return strong ETag of given versioned models.
+
+    Raise:
+        AttributeError:
+            Some model is not versioned.
+    """
+    parts: list[str] = []
+    for model in models:
+        if not getattr(model, '__versioned__', False):
+            raise AttributeError(
+                f'Model {type(model).__name__} is not versioned')
+        mapper: Any = sa.inspect(model).mapper
+        parts.append(
+            f'{mapper.base_mapper.local_table.name}'
+            f':{mapper.primary_key_from_instance(model)}:{model.version}')
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+
+def check_etag(*models: Any) -> None:
+    """Check preconditions of current request by ETag of given models and
+    remember them to set ETag of the response.
+
+    Raise:
+        NotModified:
+            ETag is matched by `If-None-Match` of GET or HEAD request.
+        PreconditionFailedError:
+            ETag is not matched by `If-Match` given for other methods.
+
+    As RFC 7232 requires, `If-None-Match` is compared weakly, so ETag
+    weakened by proxy is still matched, while `If-Match` is compared
+    strongly.
+    """
+    etag: str = make_etag(*models)
+    setattr(g, ETAG_MODELS_ATTR, models)
+
+    if request.method in ('GET', 'HEAD'):
+        if request.if_none_match.contains_weak(etag):
+            raise NotModified(etag)
+    elif request.if_match and not request.if_match.contains(etag):
+        raise PreconditionFailedError()
+
+
+def make_conditional(view: Callable, flask_app: Flask) -> Callable:
+    """Wrap view function to answer conditional requests.
+
+    Response gets ETag of models given to `check_etag()` computed after the
+    view, so written models are tagged by their new versions. Only
+    successful responses are tagged. Models
+    updated concurrently after the check fail optimistic version check on
+    flush, which is answered as failed precondition as well.
+    """
+    @wraps(view)
+    def inner(*args, **kwargs) -> Any:
+        try:
+            response: Any = view(*args, **kwargs)
+        except NotModified as error:
+            not_modified_response: Any = flask_app.response_class(status=304)
+            not_modified_response.set_etag(error.etag)
+            return not_modified_response
+        except sa.orm.exc.StaleDataError:
+            raise PreconditionFailedError()
+
+        models: tuple[Any, ...] | None = g.pop(ETAG_MODELS_ATTR, None)
+        if models is None or request.method == 'DELETE':
+            return response
+
+        response = flask_app.make_response(response)
+        if not 200 <= response.status_code < 300:
+            return response
+        response.set_etag(make_etag(*models))
+        return response
+
+    return inner
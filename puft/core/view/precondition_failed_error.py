@@ -0,0 +1,9 @@
+from puft.core.error.error import Error
+
+
+class PreconditionFailedError(Error):
+    """Resource has been changed since the version requested by client,
+    e.g. by `If-Match` header.
+    """
+    DEFAULT_MESSAGE = 'Resource has been changed by another request'
+    DEFAULT_STATUS_CODE = 412
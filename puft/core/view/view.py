@@ -1,8 +1,11 @@
+from typing import Any
+
 from flask.views import MethodView
 from warepy import Singleton, format_message
 from puft.tools.log import log
 
 from puft.tools.noconflict import makecls
+from .etag import check_etag
 
 
 class View(MethodView):
@@ -10,6 +13,10 @@ class View(MethodView):
     
     Contains general methods `get`, `post`, `put` and `delete` according to same HTTP methods 
     and should be re-implemented in children classes.
+
+    Methods can be defined as `async def` to await async Mapper methods, e.g.
+    `await User.aget_first(id=id)`. This requires Flask installed with
+    `async` extra.
     
     Refs:
         https://flask.palletsprojects.com/en/2.0.x/views/#method-views-for-apis
@@ -21,6 +28,34 @@ class View(MethodView):
     # To extend decorators in child class, use `decorators = View.decorators + [your_shiny_decorator]` 
     # in your class variable definition.
 
+    def set_etag(self, *models: Any) -> None:
+        """Set models the response depends on to make it conditional.
+
+        Should be called with versioned models (see `Mapper`) right after
+        their loading, before building the response body:
+        ```python
+        class PostView(View):
+            def get(self, id: int):
+                post: Post = Post.get_first(id=id)
+                self.set_etag(post)
+                return PostCell.gen(post).get_json()
+
+            def put(self, id: int):
+                post: Post = Post.get_first(id=id)
+                self.set_etag(post)
+                post.title = request.json['title']
+                Db.instance().commit()
+                return PostCell.gen(post).get_json()
+        ```
+        GET request with `If-None-Match` containing ETag of the models is
+        answered with 304 at once. Requests of other methods with
+        `If-Match` not containing it are answered with 412. Response gets
+        ETag of the models' versions after the view.
+
+        Applied to views registered by `Puft.register_view()`.
+        """
+        check_etag(*models)
+
     def get(self):
         error_message = format_message("Method GET is not implemented at view: {}", self.__class__.__name__)
         raise NotImplementedError(error_message)
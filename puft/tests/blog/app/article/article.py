@@ -0,0 +1,7 @@
+from puft import orm
+
+
+class Article(orm.Model):
+    __versioned__ = True
+
+    title = orm.column(orm.string(150))
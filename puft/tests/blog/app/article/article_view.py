@@ -0,0 +1,20 @@
+from flask import request
+from puft import Db, View
+
+from .article import Article
+
+
+class ArticleView(View):
+    def get(self, id: int):
+        article: Article = Article.get_first(id=id)
+        self.set_etag(article)
+        return {'title': article.title}
+
+    def put(self, id: int):
+        article: Article = Article.get_first(id=id)
+        self.set_etag(article)
+        if not request.json.get('title'):
+            return {'error': 'Title is required'}, 400
+        article.title = request.json['title']
+        Db.instance().commit()
+        return {'title': article.title}
@@ -0,0 +1,12 @@
+from puft import orm
+
+
+class Comment(orm.Model):
+    # Table named not after the class, e.g. kept from a legacy schema
+    __tablename__ = 'post_comment'
+
+    text = orm.column(orm.text)
+
+
+class PinnedComment(Comment):
+    position = orm.column(orm.integer)
@@ -0,0 +1,9 @@
+from puft import orm
+
+
+class Document(orm.Model):
+    __searchable__ = ['title', 'body']
+
+    title = orm.column(orm.string(150))
+    body = orm.column(orm.text)
+    category = orm.column(orm.string(50))
@@ -0,0 +1,8 @@
+from puft import orm
+
+
+class Event(orm.Model):
+    __shard_key__ = 'tenant'
+
+    tenant = orm.column(orm.string(50))
+    name = orm.column(orm.string(50))
@@ -0,0 +1,8 @@
+from puft import orm
+
+
+class Author(orm.Model):
+    __counters__ = {'books_count': 'books'}
+
+    name = orm.column(orm.string(50))
+    books = orm.relationship('Book', backref='author')
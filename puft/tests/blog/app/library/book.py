@@ -0,0 +1,8 @@
+from puft import orm
+
+from .author import Author
+
+
+class Book(orm.Model):
+    title = orm.column(orm.string(150))
+    author_id = orm.column(orm.integer, orm.foreign_key(Author.id))
@@ -0,0 +1,8 @@
+from puft import orm
+
+
+class Note(orm.Model):
+    __deferred__ = ['content']
+
+    title = orm.column(orm.string(150))
+    content = orm.column(orm.text)
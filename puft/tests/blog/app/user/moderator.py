@@ -0,0 +1,10 @@
+from puft import orm
+
+from .user import User
+
+
+class Moderator(User):
+    __polymorphic_load__ = 'selectin'
+
+    id = orm.column(orm.integer, orm.foreign_key(User.id), primary_key=True)
+    level = orm.column(orm.integer)
@@ -14,6 +14,17 @@ from blog.tools.shell import import_main, import_std
 from blog.app.user.user_view import UserView
 from blog.app.chat.chat_sv import ChatSv
 from blog.app.chat.chat_sock import ChatSock
+from blog.app.article.article_view import ArticleView
+# Models not referenced by services and views are imported to be mapped
+# along with the app
+from blog.app.comment.comment import Comment
+from blog.app.document.document import Document
+from blog.app.event.event import Event
+from blog.app.library.author import Author
+from blog.app.library.book import Book
+from blog.app.note.note import Note
+from blog.app.post.post import Post
+from blog.app.user.moderator import Moderator
 
 
 sv_ies: list[SvIe] = [
@@ -26,7 +37,8 @@ sock_ies: list[SockIe] = [
 ]
 
 view_ies: list[ViewIe] = [
-    ViewIe('/user/<id>', UserView)
+    ViewIe('/user/<id>', UserView),
+    ViewIe('/article/<id>', ArticleView)
 ]
 
 build = Build(
@@ -4,3 +4,4 @@ from enum import Enum
 class FilterQueryEnum(Enum):
     FIRST = 'first'
     ALL = 'all'
+    COUNT = 'count'
@@ -23,6 +23,10 @@ setup(
         ],
     },
     install_requires=install_requires,
+    extras_require={
+        # Drivers of async engine derived from sync uri
+        "async": ["aiosqlite", "asyncpg"],
+    },
     classifiers=[
         "Development Status :: 2 - Pre-Alpha",
 